@@ -6,6 +6,7 @@ import type {
 } from "../types/api";
 
 const BASE_URL = "";
+const PAGE_SIZE = 500;
 
 async function request<T>(path: string, options?: RequestInit): Promise<T> {
     const res = await fetch(`${BASE_URL}${path}`, {
@@ -29,14 +30,35 @@ export const api = {
         });
     },
 
-    getUserSessions(userId: string, activeOnly = false): Promise<UserSessionsResponse> {
-        return request<UserSessionsResponse>(
-            `/api/users/${userId}/sessions?active_only=${activeOnly}`,
-        );
+    async getUserSessions(userId: string, activeOnly = false): Promise<UserSessionsResponse> {
+        // Sessions are paginated like history; collect every page
+        const path = `/api/users/${userId}/sessions?active_only=${activeOnly}&limit=${PAGE_SIZE}`;
+        const first = await request<UserSessionsResponse>(path);
+        const sessions = [...first.sessions];
+        let nextOffset = first.next_offset;
+        while (nextOffset !== null) {
+            const page = await request<UserSessionsResponse>(`${path}&offset=${nextOffset}`);
+            sessions.push(...page.sessions);
+            nextOffset = page.next_offset;
+        }
+        return { ...first, sessions, offset: 0, next_offset: null };
     },
 
-    getSessionHistory(sessionId: string): Promise<SessionHistoryResponse> {
-        return request<SessionHistoryResponse>(`/api/sessions/${sessionId}/history`);
+    async getSessionHistory(sessionId: string): Promise<SessionHistoryResponse> {
+        // History is paginated; follow next_offset until the whole conversation is loaded
+        const first = await request<SessionHistoryResponse>(
+            `/api/sessions/${sessionId}/history?limit=${PAGE_SIZE}`,
+        );
+        const messages = [...first.messages];
+        let nextOffset = first.next_offset;
+        while (nextOffset !== null) {
+            const page = await request<SessionHistoryResponse>(
+                `/api/sessions/${sessionId}/history?offset=${nextOffset}&limit=${PAGE_SIZE}`,
+            );
+            messages.push(...page.messages);
+            nextOffset = page.next_offset;
+        }
+        return { ...first, messages, offset: 0, next_offset: null };
     },
 
     deleteSession(sessionId: string): Promise<void> {
@@ -35,10 +35,16 @@ export interface UserSessionsResponse {
     user_id: string;
     session_count: number;
     sessions: SessionInfo[];
+    offset: number;
+    limit: number;
+    next_offset: number | null;
 }
 
 export interface SessionHistoryResponse {
     session_id: string;
     messages: Message[];
+    offset: number;
+    limit: number;
+    next_offset: number | null;
     total_messages: number;
 }
@@ -41,6 +41,11 @@ class AccurateModel(BaseModel):
     temperature: int
 
 
+class ExtractionModel(BaseModel):
+    name: str
+    temperature: float
+
+
 class Clarin(BaseModel):
     name: str
     base_url: str
@@ -53,6 +58,7 @@ class Gemini(BaseModel):
 class Llm(BaseModel):
     fast_model: FastModel
     accurate_model: AccurateModel
+    extraction_model: ExtractionModel
     clarin: Clarin
     gemini: Gemini
 
@@ -77,6 +83,7 @@ class Database(BaseModel):
 class Prompts(BaseModel):
     final_answer: str
     cypher_insert: str
+    graph_extraction: str
     schema_reflection: str
     cypher_search: str
     guardrails: str
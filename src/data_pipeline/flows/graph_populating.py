@@ -1,9 +1,22 @@
 import os
+from functools import lru_cache
 
 from langchain_neo4j import Neo4jGraph
 from prefect import get_run_logger, task
 
 
+@lru_cache(maxsize=None)
+def get_graph_db(uri: str, username: str, password: str) -> Neo4jGraph:
+    """Return a process-wide Neo4jGraph per credential set.
+
+    The pipeline calls into Neo4j once or twice per page; sharing one client keeps
+    the driver's connection pool warm instead of re-doing the bolt handshake and
+    schema introspection on every task run. Callers that need the schema must call
+    ``refresh_schema()`` themselves.
+    """
+    return Neo4jGraph(url=uri, username=username, password=password, refresh_schema=False)
+
+
 class GraphPopulator:
     def __init__(self):
         uri = os.getenv("NEO4J_URI")
@@ -15,16 +28,25 @@ class GraphPopulator:
 
         logger = get_run_logger()
         logger.info(f"Connecting to Neo4j at {uri} as {username}")
-        self.graph_db = Neo4jGraph(url=uri, username=username, password=password)
+        self.graph_db = get_graph_db(uri, username, password)
 
     def execute_cypher(self, query: str):
+        """Execute pipe-separated MERGE statements as a single batched query.
+
+        The LLM emits statements separated by ``|`` with unique variable names, so
+        they can be chained into one Cypher query, giving a single round-trip and
+        transaction per page. The raw pipe-delimited string is not valid Cypher.
+        """
         logger = get_run_logger()
-        if not query or not query.strip():
+        statements = [part.strip() for part in (query or "").split("|") if part.strip()]
+        if not statements:
             logger.error("Empty Cypher query")
             return
+        batched_query = "\n".join(statements)
         try:
-            logger.info("Executing Cypher query: %s", query)
-            self.graph_db.query(query)
+            logger.info("Executing %d Cypher statements in one batch", len(statements))
+            logger.debug("Batched Cypher query: %s", batched_query)
+            self.graph_db.query(batched_query)
             logger.info("Cypher executed successfully")
         except Exception as e:
             logger.error("Failed to execute cypher: %s", e)
@@ -2,12 +2,12 @@ import os
 
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
-from langchain_neo4j import Neo4jGraph
 from langchain_openai.chat_models.base import BaseChatOpenAI
 from prefect import get_run_logger, task
 from pydantic import SecretStr
 
 from src.config.config import get_config
+from src.data_pipeline.flows.graph_populating import get_graph_db
 
 
 @task
@@ -28,7 +28,8 @@ def reflect_on_schema() -> str:
         logger.warning("Neo4j credentials not set — skipping schema reflection")
         return ""
 
-    graph = Neo4jGraph(url=uri, username=username, password=password)
+    graph = get_graph_db(uri, username, password)
+    graph.refresh_schema()
     schema = graph.get_schema
 
     if not schema or not schema.strip():
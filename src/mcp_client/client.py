@@ -109,7 +109,7 @@ async def get_knowledge_graph_data(
 async def query_knowledge_graph(user_input: str, trace_id: str = None):
     """Query the knowledge graph with user input."""
 
-    trace_id = str(uuid.uuid4().hex)
+    trace_id = uuid.uuid4().hex
 
     data = await get_knowledge_graph_data(
         user_input,
@@ -1,17 +1,25 @@
+import asyncio
+import logging
 import os
+from typing import List
 
+import orjson
 from dotenv import load_dotenv
 from fastmcp import FastMCP
+from fastmcp.exceptions import ToolError
 
 from ..config.config import get_config
 from .tools.knowledge_graph.rag import RAG
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 mcp = FastMCP("SOLVRO MCP")
 
 rag = None
 langfuse = None
+RAG_NOT_INITIALIZED = "RAG not initialized. Please start the server first."
 handler = None
 
 # Initialize Langfuse only if credentials are configured
@@ -73,21 +81,63 @@ async def knowledge_graph_tool(user_input: str, trace_id: str = None) -> str:
 
     Returns:
         AI-generated instructions based on knowledge graph data
+
+    Raises:
+        ToolError: If the RAG pipeline has not been initialized
     """
     if rag is None:
-        return "Error: RAG not initialized. Please start the server first."
+        raise ToolError(RAG_NOT_INITIALIZED)
 
     result = await rag.ainvoke(message=user_input, trace_id=trace_id, callback_handler=handler)
 
-    metadata = result.get("metadata", {})
-    print(f"[Guardrail decision] {metadata.get('guardrail_decision')}")
-    print(f"[Generated Cypher]\n{metadata.get('cypher_query')}")
-    print(f"[Graph context]\n{metadata.get('context')}")
+    if logger.isEnabledFor(logging.DEBUG):
+        metadata = result.get("metadata", {})
+        logger.debug("[Guardrail decision] %s", metadata.get("guardrail_decision"))
+        logger.debug("[Generated Cypher]\n%s", metadata.get("cypher_query"))
+        logger.debug("[Graph context]\n%s", metadata.get("context"))
 
     # Return the answer directly (already a JSON string from rag.py)
     return result["answer"]
 
 
+@mcp.tool
+async def knowledge_graph_tool_batch(queries: List[dict]) -> str:
+    """
+    Query the knowledge graph with several questions in one call.
+
+    Args:
+        queries: Objects with ``user_input`` and an optional ``trace_id``
+
+    Returns:
+        JSON list with, per query and in order, ``{"answer": ...}`` or ``{"error": ...}``
+
+    Raises:
+        ToolError: If the RAG pipeline has not been initialized, as knowledge_graph_tool does
+    """
+    if rag is None:
+        raise ToolError(RAG_NOT_INITIALIZED)
+
+    results = await asyncio.gather(
+        *(
+            rag.ainvoke(
+                message=query["user_input"],
+                trace_id=query.get("trace_id"),
+                callback_handler=handler,
+            )
+            for query in queries
+        ),
+        return_exceptions=True,
+    )
+    return orjson.dumps(
+        [
+            {"error": str(result)}
+            if isinstance(result, Exception)
+            else {"answer": result["answer"]}
+            for result in results
+        ]
+    ).decode()
+
+
 def main():
     """Main entry point for the MCP server."""
     import os
@@ -1,7 +1,11 @@
-import json
+import asyncio
+import logging
 import os
-from typing import Any, Dict
+import re
+import unicodedata
+from typing import Any, Dict, List
 
+import orjson
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -14,6 +18,31 @@ from ....config.config import get_config
 from .graph_visualizer import GraphVisualizer
 from .state import State
 
+logger = logging.getLogger(__name__)
+
+# Matches quoted strings and identifiers, which are skipped whole, or a ';' (group 1)
+# where a new read statement begins. Only the latter separates statements.
+_STATEMENT_SEPARATOR = re.compile(
+    r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`"
+    r"|(;)\s*(?=(?:OPTIONAL\s+)?MATCH\b|CALL\b|UNWIND\b|WITH\b)",
+    re.IGNORECASE | re.DOTALL,
+)
+
+# ASCII-folded words that unambiguously mark a question as university-related.
+# Questions matching one of them skip the LLM guardrails round-trip entirely.
+_UNIVERSITY_KEYWORDS = re.compile(
+    r"\b(?:"
+    # Stems no common non-university word starts with; any ending is accepted
+    r"(?:politechnik|uczelni|wydzial|dziekan|prorektor|rektor|profesor|sylabus|semestr"
+    r"|egzamin|kolokwi|laboratori|student|stypendi|rekrutac|akademik)[a-z]*"
+    # Ambiguous as prefixes (wykladnik, studio), so only these inflected forms
+    r"|wyklad(?:y|u|ow|zie|em|ach|ami)?|studi(?:a|ow|ach|ami|om)"
+    r"|pwr|prof|ects"
+    r")\b"
+)
+
+_ASCII_FOLD = str.maketrans({"ł": "l", "Ł": "L"})
+
 
 class RAG:
     """Retrieval-Augmented Generation system with Neo4j graph database backend."""
@@ -128,9 +157,9 @@ class RAG:
 
             if not is_empty:
                 self._cached_schema = db_schema
-                print(f"[Schema] fetched {len(db_schema)} chars from Neo4j")
+                logger.info("[Schema] fetched %d chars from Neo4j", len(db_schema))
             else:
-                print("[Schema] database is empty — schema will be re-fetched on next call")
+                logger.warning("[Schema] database is empty — will re-fetch on next call")
 
         return self._cached_schema or ""
 
@@ -139,7 +168,7 @@ class RAG:
         return self.visualizer
 
     def _initialize_prompt_templates(self):
-        """Initialize all prompt templates used in the RAG pipeline."""
+        """Initialize prompt templates and the LLM chains built on top of them."""
         config = get_config()
 
         self.generate_cypher_template = PromptTemplate(
@@ -151,6 +180,12 @@ class RAG:
             input_variables=["user_question"], template=config.prompts.guardrails
         )
 
+        # Compose the runnable chains once; they are stateless and reused on every call.
+        self.generate_cypher_chain = (
+            self.generate_cypher_template | self.cypher_llm | StrOutputParser()
+        )
+        self.guardrails_chain = self.guard_rails_template | self.fast_llm | StrOutputParser()
+
     def _build_processing_graph(self):
         """Construct the state machine graph for the RAG pipeline."""
         builder = StateGraph(State)
@@ -194,7 +229,7 @@ class RAG:
 
         return builder.compile()
 
-    def generate_cypher(self, state: State):
+    async def generate_cypher(self, state: State):
         """
         Generate CYPHER query from user question using database schema.
         Uses better model (gpt-5-mini) for complex Cypher generation.
@@ -206,10 +241,14 @@ class RAG:
             Updated state with generated CYPHER query
         """
         schema = self.schema
-        print(f"[Schema used for Cypher generation] ({len(schema)} chars):\n{schema or '(empty)'}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "[Schema used for Cypher generation] (%d chars):\n%s",
+                len(schema),
+                schema or "(empty)",
+            )
 
-        chain = self.generate_cypher_template | self.cypher_llm | StrOutputParser()
-        generated_cypher = chain.invoke(
+        generated_cypher = await self.generate_cypher_chain.ainvoke(
             {
                 "user_question": state["user_question"],
                 "schema": schema,
@@ -223,10 +262,47 @@ class RAG:
 
         return {"generated_cypher": generated_cypher}
 
-    def retrieve(self, state: State):
+    def _split_statements(self, cypher_query: str) -> List[str]:
+        """Split generated Cypher into independent statements, each with a LIMIT."""
+        cypher_query = cypher_query or ""
+        separators = [m.span(1) for m in _STATEMENT_SEPARATOR.finditer(cypher_query) if m.group(1)]
+        starts = [0, *(end for _, end in separators)]
+        ends = [*(start for start, _ in separators), len(cypher_query)]
+        bounds = zip(starts, ends)
+
+        statements = []
+        for statement in (cypher_query[start:end] for start, end in bounds):
+            statement = statement.strip().rstrip(";")
+            if not statement:
+                continue
+            if "LIMIT" not in statement.upper():
+                statement = f"{statement} LIMIT {self.max_results}"
+            statements.append(statement)
+        return statements
+
+    def _merge_results(self, results: List[Any]) -> Dict[str, Any]:
+        """Merge per-statement results (or exceptions) into a single context update."""
+        context = []
+        errors = []
+
+        for result in results:
+            if isinstance(result, Exception):
+                errors.append(str(result))
+                logger.warning("[Query Error] %s", result)
+            else:
+                context.extend(result)
+
+        if errors and not context:
+            return {"context": [], "generated_cypher": f"Query failed: {'; '.join(errors)}"}
+
+        return {"context": context}
+
+    async def retrieve(self, state: State):
         """
         Execute CYPHER query against Neo4j database and retrieve results.
         If query fails, return empty context and use general knowledge.
+        When the LLM emits several statements they are sent to Neo4j concurrently,
+        so the node costs max() instead of sum() of the query latencies.
 
         Args:
             state: Current pipeline state
@@ -234,28 +310,26 @@ class RAG:
         Returns:
             Updated state with retrieved context
         """
-        cypher_query = state.get("generated_cypher", "")
-
-        try:
-            if "LIMIT" not in cypher_query.upper():
-                cypher_query = f"{cypher_query.rstrip(';')} LIMIT {self.max_results}"
-
-            response = self.database.query(cypher_query)
-
-            return {"context": response}
-
-        except Exception as e:
-            error_msg = str(e)
+        statements = self._split_statements(state.get("generated_cypher", ""))
+        results = await asyncio.gather(
+            *(asyncio.to_thread(self.database.query, statement) for statement in statements),
+            return_exceptions=True,
+        )
 
-            if self.enable_debug:
-                print(f"[Query Error] {error_msg}")
+        return self._merge_results(results)
 
-            return {"context": [], "generated_cypher": f"Query failed: {error_msg}"}
+    @staticmethod
+    def _matches_university_keywords(question: str) -> bool:
+        """Cheap local check whether a question is clearly about the university."""
+        folded = unicodedata.normalize("NFKD", question.translate(_ASCII_FOLD).lower())
+        folded = "".join(ch for ch in folded if not unicodedata.combining(ch))
+        return _UNIVERSITY_KEYWORDS.search(folded) is not None
 
-    def guardrails_system(self, state: State):
+    async def guardrails_system(self, state: State):
         """
         Decide whether to use graph retrieval or general LLM knowledge.
-        Uses fast model (gpt-5-nano) for quick decision.
+        Questions with obvious university keywords are routed locally; the rest
+        fall back to the fast model (gpt-5-nano) for the decision.
 
         Args:
             state: Current pipeline state
@@ -263,20 +337,21 @@ class RAG:
         Returns:
             Updated state with next node decision
         """
-        guardrails_chain = self.guard_rails_template | self.fast_llm | StrOutputParser()
-
-        guardrail_output = (
-            guardrails_chain.invoke(
-                {"user_question": state["user_question"]},
-                config=self._get_invoke_config(
-                    trace_id=state["trace_id"],
-                    tags=["knowledge_graph", "guardrails"],
-                    run_name="Guardrails",
-                ),
-            )
-            .strip()
-            .lower()
+        if self._matches_university_keywords(state["user_question"]):
+            return {
+                "next_node": "generate_cypher",
+                "guardrail_decision": "generate_cypher (keyword match)",
+            }
+
+        guardrail_output = await self.guardrails_chain.ainvoke(
+            {"user_question": state["user_question"]},
+            config=self._get_invoke_config(
+                trace_id=state["trace_id"],
+                tags=["knowledge_graph", "guardrails"],
+                run_name="Guardrails",
+            ),
         )
+        guardrail_output = guardrail_output.strip().lower()
 
         next_node = "generate_cypher" if "generate" in guardrail_output else "end"
 
@@ -306,6 +381,9 @@ class RAG:
         """
         Execute the RAG pipeline with user message.
 
+        Thin synchronous wrapper around ainvoke so that both entry points share
+        the same (async) graph nodes. Must not be called from a running event loop.
+
         Args:
             message: User's question/input
             session_id: Session identifier for tracking
@@ -313,29 +391,7 @@ class RAG:
         Returns:
             Dictionary with context from graph or "W bazie danych nie ma informacji"
         """
-        result = self.graph.invoke({"user_question": message})
-
-        if result.get("answer") == "W bazie danych nie ma informacji":
-            return {
-                "answer": "W bazie danych nie ma informacji",
-                "metadata": {
-                    "guardrail_decision": result.get("guardrail_decision"),
-                    "cypher_query": None,
-                    "context": [],
-                },
-            }
-
-        context_data = result.get("context", [])
-        context_json = json.dumps(context_data, ensure_ascii=False, indent=2)
-
-        return {
-            "answer": context_json,
-            "metadata": {
-                "guardrail_decision": result.get("guardrail_decision"),
-                "cypher_query": result.get("generated_cypher"),
-                "context": context_data,
-            },
-        }
+        return asyncio.run(self.ainvoke(message, session_id=session_id))
 
     async def ainvoke(
         self,
@@ -369,7 +425,8 @@ class RAG:
             }
 
         context_data = result.get("context", [])
-        context_json = json.dumps(context_data, ensure_ascii=False, indent=2)
+        # Compact UTF-8 output; neo4j temporal values fall back to their string form.
+        context_json = orjson.dumps(context_data, default=str).decode()
 
         return {
             "answer": context_json,
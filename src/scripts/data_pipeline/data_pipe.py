@@ -1,15 +1,132 @@
 import logging
+import multiprocessing
 import os
-from typing import List
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+from queue import Queue
+from threading import Lock, Thread
+from typing import Dict, List, Optional, Tuple
 
-from langchain_neo4j import Neo4jGraph
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from neo4j import GraphDatabase, ManagedTransaction
+from semantic_text_splitter import TextSplitter
 
 from config.config import get_config
 
 from .llm_pipe import LLMPipe
 from .pdf_loader import PDFLoader
 
+WRITE_BATCH_SIZE = 20000
+# Rows streamed during generation are written in small batches so writes overlap the LLM
+STREAM_WRITE_BATCH_SIZE = 500
+LLM_BATCH_SIZE = 64
+SUFFIXES = (".pdf", ".txt", ".docx")
+WRITE_QUEUE_SIZE = 8
+
+
+def _quote_identifier(name: str) -> str:
+    """Backtick-quote a label or relationship type; these cannot be query parameters."""
+    return "`" + name.replace("`", "``") + "`"
+
+
+def build_write_queries(
+    nodes: List[dict], edges: List[dict], batch_size: int = WRITE_BATCH_SIZE
+) -> List[Tuple[str, List[dict]]]:
+    """
+    Group extracted rows into parameterised UNWIND statements.
+
+    One statement is produced per node label and per (source label, type, target label)
+    edge shape, sliced into batches of at most batch_size rows. Node statements come
+    first so relationships always find their endpoints.
+
+    Args:
+        nodes: Node rows with label, title and context
+        edges: Edge rows with source_label, source, type, target_label and target
+        batch_size: Maximum number of rows per statement
+
+    Returns:
+        List of (query, rows) pairs to run with ``{"rows": rows}`` as parameters
+    """
+    nodes_by_label: Dict[str, List[dict]] = defaultdict(list)
+    for node in nodes:
+        nodes_by_label[node["label"]].append(
+            {"title": node["title"], "context": node.get("context", "")}
+        )
+
+    edges_by_shape: Dict[tuple, List[dict]] = defaultdict(list)
+    for edge in edges:
+        shape = (edge["source_label"], edge["type"], edge["target_label"])
+        edges_by_shape[shape].append({"source": edge["source"], "target": edge["target"]})
+
+    statements = []
+    for label, rows in nodes_by_label.items():
+        query = (
+            f"UNWIND $rows AS row MERGE (n:{_quote_identifier(label)} {{title: row.title}}) "
+            "SET n.context = row.context"
+        )
+        statements.append((query, rows))
+
+    for (source_label, rel_type, target_label), rows in edges_by_shape.items():
+        query = (
+            f"UNWIND $rows AS row "
+            f"MATCH (a:{_quote_identifier(source_label)} {{title: row.source}}) "
+            f"MATCH (b:{_quote_identifier(target_label)} {{title: row.target}}) "
+            f"MERGE (a)-[:{_quote_identifier(rel_type)}]->(b)"
+        )
+        statements.append((query, rows))
+
+    return [
+        (query, rows[start : start + batch_size])
+        for query, rows in statements
+        for start in range(0, len(rows), batch_size)
+    ]
+
+
+def _run_statements(tx: ManagedTransaction, statements: List[Tuple[str, List[dict]]]) -> None:
+    for query, batch in statements:
+        tx.run(query, rows=batch)
+
+
+@lru_cache(maxsize=None)
+def _get_splitter(max_chunk_size: int, chunk_overlap: int) -> TextSplitter:
+    """Build the splitter once per worker process and reuse it for every file."""
+    return TextSplitter(capacity=max_chunk_size, overlap=chunk_overlap)
+
+
+def _parse_file(
+    file_path: str, max_chunk_size: int, chunk_overlap: int
+) -> Tuple[List[str], Optional[str]]:
+    """
+    Load a single file and split it into chunks.
+
+    Runs in a worker process, so instead of logging it returns the chunks together
+    with an error message (None on success) for the parent to report.
+    """
+    try:
+        if not os.path.exists(file_path):
+            return [], f"File not found: {file_path}"
+
+        if os.path.getsize(file_path) == 0:
+            return [], f"Empty file: {file_path}"
+
+        content = PDFLoader(file_path).load_document()
+
+        if content.startswith("ERROR:"):
+            return [], content
+
+        if len(content) <= max_chunk_size:
+            return [content], None
+
+        chunks = _get_splitter(max_chunk_size, chunk_overlap).chunks(content)
+        filename = os.path.basename(file_path)
+        return [
+            f"[Part {i + 1} of {len(chunks)} from {filename}] {chunk}"
+            for i, chunk in enumerate(chunks)
+        ], None
+    except Exception as e:
+        return [], f"Error loading file {file_path}: {str(e)}"
+
 
 class DataPipe:
     def __init__(
@@ -32,6 +149,9 @@ class DataPipe:
             chunk_overlap = config.data_pipeline.chunk_overlap
 
         self.docs_data = []
+        self._pending_nodes: List[dict] = []
+        self._pending_edges: List[dict] = []
+        self._pending_lock = Lock()
 
         if not url:
             raise ValueError("Neo4j URL is required")
@@ -44,12 +164,18 @@ class DataPipe:
         logging.info(f"Username: {username}")
 
         try:
-            self.llm_pipe = LLMPipe(api_key=api_key)  # , nodes=nodes, relations=relations)
-            self.graph_db = Neo4jGraph(url=url, username=username, password=password)
+            self.llm_pipe = LLMPipe(api_key=api_key, nodes=nodes, relations=relations)
+            # One long-lived driver keeps a connection pool instead of a session per query
+            self.driver = GraphDatabase.driver(url, auth=(username, password))
 
-            self.graph_db.query("RETURN 1 as test")
+            self.driver.verify_connectivity()
             logging.info("Successfully connected to Neo4j database")
 
+            # Writes go through a single background thread so extraction never waits on Neo4j
+            self._write_queue: Queue = Queue(maxsize=WRITE_QUEUE_SIZE)
+            self._writer = Thread(target=self._write_loop, name="neo4j-writer", daemon=True)
+            self._writer.start()
+
         except Exception as e:
             logging.error(f"Failed to connect to Neo4j: {str(e)}")
             logging.error(f"URL: {url}")
@@ -58,62 +184,41 @@ class DataPipe:
 
         self.max_chunk_size = max_chunk_size
         self.chunk_overlap = chunk_overlap
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.max_chunk_size,
-            chunk_overlap=self.chunk_overlap,
-            length_function=len,
-        )
         logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-    def _load_data(self, file_path: str) -> None:
-        """Load data from a file and append it to the docs_data list."""
-        try:
-            if not os.path.exists(file_path):
-                logging.error(f"File not found: {file_path}")
-                return
-
-            if os.path.getsize(file_path) == 0:
-                logging.error(f"Empty file: {file_path}")
-                return
-
-            logging.info(f"Loading file: {file_path}")
-            loader = PDFLoader(file_path)
-            content = loader.load_document()
-
-            if content.startswith("ERROR:"):
-                logging.error(content)
-                return
-
-            if len(content) > self.max_chunk_size:
-                logging.info(f"Document is large ({len(content)} chars), splitting into chunks")
-                chunks = self.text_splitter.split_text(content)
-                for i, chunk in enumerate(chunks):
-                    filename = os.path.basename(file_path)
-                    part_info = f"[Part {i + 1} of {len(chunks)} from {filename}]"
-                    self.docs_data.append(f"{part_info} {chunk}")
-                    logging.info(f"Added chunk {i + 1} of {len(chunks)} from {file_path}")
-            else:
-                self.docs_data.append(content)
-
-            logging.info(f"Successfully loaded: {file_path}")
-        except Exception as e:
-            logging.error(f"Error loading file {file_path}: {str(e)}")
-
     def load_data_from_directory(self, directory_path: str) -> None:
-        """Load data from all files in a given directory."""
+        """Load data from all files in a given directory, parsing files in parallel."""
         if not os.path.exists(directory_path):
             logging.error(f"Directory not found: {directory_path}")
             return
 
         logging.info(f"Loading files from directory: {directory_path}")
-        file_count = 0
-
-        for filename in os.listdir(directory_path):
-            if filename.endswith(".pdf") or filename.endswith(".txt") or filename.endswith(".docx"):
-                self._load_data(os.path.join(directory_path, filename))
-                file_count += 1
-
-        logging.info(f"Loaded {len(self.docs_data)} documents/chunks from {file_count} files")
+        with os.scandir(directory_path) as entries:
+            file_paths = [
+                entry.path for entry in entries if entry.name.endswith(SUFFIXES) and entry.is_file()
+            ]
+
+        # PDF parsing is CPU-bound pure Python, so threads would serialise on the GIL.
+        # Spawn the workers: forking now would copy the running writer thread's locks
+        # and the Neo4j driver's sockets into every child.
+        with ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn")) as executor:
+            results = executor.map(
+                _parse_file,
+                file_paths,
+                repeat(self.max_chunk_size),
+                repeat(self.chunk_overlap),
+                chunksize=4,
+            )
+            for file_path, (chunks, error) in zip(file_paths, results):
+                if error:
+                    logging.error(error)
+                    continue
+                if len(chunks) > 1:
+                    logging.info(f"Split {file_path} into {len(chunks)} chunks")
+                self.docs_data.extend(chunks)
+                logging.info(f"Successfully loaded: {file_path}")
+
+        logging.info(f"Loaded {len(self.docs_data)} documents/chunks from {len(file_paths)} files")
 
     def clear_database(self) -> None:
         """Clear the Neo4j database."""
@@ -123,48 +228,117 @@ class DataPipe:
         except Exception as e:
             logging.error(f"Error clearing database: {str(e)}")
 
-    def execute_cypher(self, query: str) -> None:
+    def execute_cypher(self, query: str, params: dict = None) -> None:
         """Execute a Cypher query on the Neo4j database."""
         if not query or not query.strip():
             logging.error("Empty Cypher query")
             return
 
         try:
-            self.graph_db.query(query)
+            with self.driver.session() as session:
+                session.run(query, params or {}).consume()
             logging.info("Cypher query executed successfully")
         except Exception as e:
             logging.error(f"Error executing Cypher query: {str(e)}")
             logging.error(f"Query: {query}")
             raise
 
-    def process_documents(self):
-        """Process all loaded documents through the LLM pipe."""
+    def close(self) -> None:
+        """Write out any pending rows, stop the writer thread and close the driver."""
+        self.flush()
+        self._write_queue.put(None)
+        self._writer.join()
+        self.driver.close()
+
+    def add_rows(
+        self, nodes: List[dict], edges: List[dict], batch_size: int = WRITE_BATCH_SIZE
+    ) -> None:
+        """Buffer extracted rows and hand them to the writer once batch_size is reached."""
+        with self._pending_lock:
+            self._pending_nodes.extend(nodes)
+            self._pending_edges.extend(edges)
+            if len(self._pending_nodes) + len(self._pending_edges) < batch_size:
+                return
+            batch = self._take_pending()
+
+        # Blocks only when the writer is WRITE_QUEUE_SIZE batches behind
+        self._write_queue.put(batch)
+
+    def flush(self) -> None:
+        """Hand over the remaining buffered rows and wait until every batch is written."""
+        with self._pending_lock:
+            batch = self._take_pending()
+
+        if batch[0] or batch[1]:
+            self._write_queue.put(batch)
+        self._write_queue.join()
+
+    def _take_pending(self) -> Tuple[List[dict], List[dict]]:
+        batch = (self._pending_nodes, self._pending_edges)
+        self._pending_nodes, self._pending_edges = [], []
+        return batch
+
+    def _write_loop(self) -> None:
+        """Background writer: drain the queue until close() sends ``None``."""
+        while (batch := self._write_queue.get()) is not None:
+            try:
+                self.write_rows(*batch)
+            finally:
+                self._write_queue.task_done()
+        self._write_queue.task_done()
+
+    def write_rows(
+        self, nodes: List[dict], edges: List[dict], batch_size: int = WRITE_BATCH_SIZE
+    ) -> int:
+        """
+        Write rows in one transaction, with one UNWIND statement per label/relation shape.
+
+        Returns:
+            Number of rows written
+        """
+        if not nodes and not edges:
+            return 0
+
+        statements = build_write_queries(nodes, edges, batch_size)
+        try:
+            with self.driver.session() as session:
+                session.execute_write(_run_statements, statements)
+        except Exception as e:
+            logging.error(f"Failed to write batch of {len(nodes) + len(edges)} rows: {str(e)}")
+            return 0
+
+        written = len(nodes) + len(edges)
+        logging.info(f"Flushed {written} rows to Neo4j")
+        return written
+
+    def process_documents(self, batch_size: int = LLM_BATCH_SIZE):
+        """Process all loaded documents through the LLM pipe and batch-write the results."""
         all_results = []
 
-        for i, doc in enumerate(self.docs_data):
+        for start in range(0, len(self.docs_data), batch_size):
+            docs = self.docs_data[start : start + batch_size]
+            logging.info(
+                f"Processing document chunks {start + 1}-{start + len(docs)}/{len(self.docs_data)}"
+            )
+
+            for doc in docs:
+                if len(doc) > self.max_chunk_size * 2:
+                    logging.warning(f"Document chunk may be too large for model ({len(doc)} chars)")
+
             try:
-                logging.info(f"Processing document chunk {i + 1}/{len(self.docs_data)}")
-                char_count = len(doc)
-                logging.info(f"Document chunk size: {char_count} characters")
-
-                if char_count > self.max_chunk_size * 2:
-                    logging.warning(
-                        f"Document chunk may be too large for model ({char_count} chars)"
-                    )
-
-                cypher_code = "".join([code for code in self.llm_pipe.run(doc)])
-
-                logging.info(f"Generated Cypher code of length {len(cypher_code)}")
-                logging.info(
-                    "Executing Cypher for document: " + doc[:50] + "..." if len(doc) > 50 else doc
-                )
-
-                try:
-                    self.execute_cypher(cypher_code)
-                    all_results.append(cypher_code)
-                except Exception as e:
-                    logging.error(f"Failed to execute Cypher: {str(e)}")
+                batch_rows = self.llm_pipe.run_batch(docs)
             except Exception as e:
-                logging.error(f"Error processing document chunk {i + 1}: {str(e)}")
+                logging.error(f"Error processing document chunks from {start + 1}: {str(e)}")
+                continue
+
+            for rows in batch_rows:
+                self.add_rows(rows["nodes"], rows["edges"])
+            logging.info(
+                f"Extracted {sum(len(rows['nodes']) for rows in batch_rows)} nodes and "
+                f"{sum(len(rows['edges']) for rows in batch_rows)} edges"
+            )
+            all_results.extend(batch_rows)
+
+        self.flush()
 
         return all_results
@@ -1,39 +1,110 @@
-from typing import List
+import hashlib
+import logging
+import re
+from typing import AsyncIterator, Dict, List, Optional
 
-from langchain.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from langchain_core.messages import SystemMessage
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
 from langchain_openai.chat_models.base import BaseChatOpenAI
 from langgraph.graph import END, START, MessagesState, StateGraph
+from pydantic import BaseModel, Field, ValidationError
 
 from config.config import get_config
 
+NODE_KEYS = ("label", "title")
+EDGE_KEYS = ("source_label", "source", "type", "target_label", "target")
+
+# DataPipe prefixes split chunks with "[Part i of n from file]"; it must not affect caching.
+_PART_HEADER = re.compile(r"^\[Part \d+ of \d+ from [^\]]*\]\s*")
+_WHITESPACE = re.compile(r"\s+")
+
+# Node titles are stored ASCII-only; transliterating here keeps it deterministic.
+_PL_TO_ASCII = str.maketrans("ąćęłńóśźżĄĆĘŁŃÓŚŹŻ", "acelnoszzACELNOSZZ")
+
+
+class NodeSpec(BaseModel):
+    label: str = Field(description="PascalCase node label from the allowed labels")
+    title: str = Field(description="Name that identifies the node")
+    context: str = Field(default="", description="Short description of the node")
+
+
+class EdgeSpec(BaseModel):
+    source_label: str = Field(description="Label of the source node")
+    source: str = Field(description="Title of the source node")
+    type: str = Field(description="Relationship type in UPPER_SNAKE_CASE")
+    target_label: str = Field(description="Label of the target node")
+    target: str = Field(description="Title of the target node")
+
+
+class ExtractedGraph(BaseModel):
+    """Nodes and edges extracted from one document chunk."""
+
+    nodes: List[NodeSpec]
+    edges: List[EdgeSpec]
+
 
 class PipeState(MessagesState):
     context: str
-    generated_cypher: List[str]
+    nodes: List[dict]
+    edges: List[dict]
 
 
 class LLMPipe:
     def __init__(self, api_key: str = None, nodes: List[str] = None, relations: List[str] = None):
         config = get_config()
-        BaseChatOpenAI(
+        # Extraction is a tightly specified transformation, so a small model handles it;
+        # the accurate model only sees chunks whose output could not be parsed.
+        self.model = BaseChatOpenAI(
+            model=config.llm.extraction_model.name,
+            api_key=api_key,
+            temperature=config.llm.extraction_model.temperature,
+        )
+        self.fallback_model = BaseChatOpenAI(
             model=config.llm.accurate_model.name,
             api_key=api_key,
             temperature=config.llm.accurate_model.temperature,
         )
-        self._initialize_prompt_templates()
         self.nodes = nodes
         self.relations = relations
+        self._initialize_prompt_templates()
+        # Structured output constrains the model to the ExtractedGraph JSON schema, so
+        # a response that fails validation raises and goes to the fallback model.
+        to_rows = RunnableLambda(self._to_rows)
+        self.generate_chain = (
+            self.generate_template | self.model.with_structured_output(ExtractedGraph) | to_rows
+        ).with_fallbacks(
+            [
+                self.generate_template
+                | self.fallback_model.with_structured_output(ExtractedGraph)
+                | to_rows
+            ]
+        )
+        # Same schema, but as raw JSON text so partial objects can be parsed mid-stream
+        self.stream_chain = (
+            self.generate_template
+            | self.model.bind(response_format=ExtractedGraph)
+            | JsonOutputParser()
+        )
+        self._cache: Dict[str, Dict[str, List[dict]]] = {}
         self._build_pipe_graph()
 
     def _initialize_prompt_templates(self) -> None:
         """Initialize all prompt templates used in the RAG pipeline."""
         config = get_config()
-        template_str = config.prompts.cypher_search
 
-        self.generate_template = PromptTemplate(
-            input_variables=["context", "nodes", "relations"],
-            template=template_str,
+        # Static instructions go first as the system message and only the chunk varies,
+        # so every request shares a byte-identical prefix that providers cache. The
+        # labels are fixed for the whole run, so the system message is rendered once here.
+        system_prompt = config.prompts.graph_extraction.format(
+            nodes=self.nodes, relations=self.relations
+        )
+        self.generate_template = ChatPromptTemplate.from_messages(
+            [
+                SystemMessage(content=system_prompt),
+                ("human", "CONTEXT: {context}"),
+            ]
         )
 
     def _build_pipe_graph(self) -> None:
@@ -42,39 +113,231 @@ class LLMPipe:
         builder = StateGraph(PipeState)
 
         nodes = [
-            ("generate", self.generate_cypher),
+            ("extract", RunnableLambda(self.extract_rows, afunc=self.aextract_rows)),
         ]
 
         for node_name, node_func in nodes:
             builder.add_node(node_name, node_func)
 
-        builder.add_edge(START, "generate")
-        builder.add_edge("generate", END)
+        builder.add_edge(START, "extract")
+        builder.add_edge("extract", END)
 
         self.graph = builder.compile()
 
-    def generate_cypher(self, state: PipeState) -> List[str]:
-        chain = self.generate_template | self.model | StrOutputParser()
+    @staticmethod
+    def _to_rows(graph: ExtractedGraph) -> Dict[str, List[dict]]:
+        """
+        Convert validated output into node and edge rows, dropping blank entries.
 
-        cypher_code = chain.invoke(
+        Titles and contexts are transliterated to ASCII so that edge endpoints match
+        the node titles they refer to.
+        """
+        nodes = [
             {
-                "context": state["context"],
-                "nodes": self.nodes,
-                "relations": self.relations,
+                "label": node.label,
+                "title": node.title.translate(_PL_TO_ASCII),
+                "context": node.context.translate(_PL_TO_ASCII),
             }
-        )
+            for node in graph.nodes
+            if all(getattr(node, key) for key in NODE_KEYS)
+        ]
+        edges = [
+            {
+                **edge.model_dump(),
+                "source": edge.source.translate(_PL_TO_ASCII),
+                "target": edge.target.translate(_PL_TO_ASCII),
+            }
+            for edge in graph.edges
+            if all(getattr(edge, key) for key in EDGE_KEYS)
+        ]
+        return {"nodes": nodes, "edges": edges}
+
+    def extract_rows(self, state: PipeState) -> Dict[str, List[dict]]:
+        """
+        Extract node and edge rows from the chunk in the pipeline state.
+
+        Args:
+            state: Pipeline state holding the document chunk under ``context``
+
+        Returns:
+            Dict with ``nodes`` and ``edges`` rows, both empty if extraction failed
+        """
+        try:
+            return self.generate_chain.invoke({"context": state["context"]})
+        except Exception as e:
+            logging.error(f"Error generating rows for chunk: {str(e)}")
+            return {"nodes": [], "edges": []}
+
+    async def aextract_rows(self, state: PipeState) -> Dict[str, List[dict]]:
+        """
+        Async version of extract_rows.
+
+        Args:
+            state: Pipeline state holding the document chunk under ``context``
+
+        Returns:
+            Dict with ``nodes`` and ``edges`` rows, both empty if extraction failed
+        """
+        try:
+            return await self.generate_chain.ainvoke({"context": state["context"]})
+        except Exception as e:
+            logging.error(f"Error generating rows for chunk: {str(e)}")
+            return {"nodes": [], "edges": []}
 
-        return {
-            "generated_cypher": [code_part for code_part in cypher_code.split("|")],
-        }
+    @staticmethod
+    def _cache_key(context: str) -> str:
+        """Key chunks by normalised content so repeated boilerplate maps to one entry."""
+        normalized = _WHITESPACE.sub(" ", _PART_HEADER.sub("", context)).strip().lower()
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def _get_cached(self, key: str) -> Optional[Dict[str, List[dict]]]:
+        cached = self._cache.get(key)
+        if cached is not None:
+            logging.info("Reusing extraction for a previously seen chunk")
+        return cached
+
+    def _store(self, key: str, rows: Dict[str, List[dict]]) -> Dict[str, List[dict]]:
+        # Empty results usually mean a failed generation, so they are retried next time.
+        if rows["nodes"]:
+            self._cache[key] = rows
+        return rows
+
+    def run(self, context: str) -> Dict[str, List[dict]]:
+        """Run the pipeline and return extracted ``nodes`` and ``edges`` rows."""
+        key = self._cache_key(context)
+        if (cached := self._get_cached(key)) is not None:
+            return cached
 
-    def run(self, context: str) -> List[str]:
-        """Run the pipeline with the given context."""
         result = self.graph.invoke(
             {
                 "context": context,
-                "generated_cypher": [],
+                "nodes": [],
+                "edges": [],
             },
             config={"configurable": {"thread_id": 1}},
         )
-        return result["generated_cypher"]
+        return self._store(key, {"nodes": result["nodes"], "edges": result["edges"]})
+
+    def run_batch(
+        self, contexts: List[str], max_concurrency: int = 32
+    ) -> List[Dict[str, List[dict]]]:
+        """
+        Extract rows for many chunks at once through ``Runnable.batch``.
+
+        Cached chunks are answered directly; the rest are sent as concurrent requests
+        sharing the same system prompt.
+
+        Args:
+            contexts: Document chunks to extract from
+            max_concurrency: Maximum number of requests in flight
+
+        Returns:
+            One ``nodes``/``edges`` dict per context, in input order
+        """
+        keys = [self._cache_key(context) for context in contexts]
+        results: List[Optional[Dict[str, List[dict]]]] = [self._get_cached(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+
+        outputs = self.generate_chain.batch(
+            [{"context": contexts[i]} for i in missing],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True,
+        )
+
+        for i, output in zip(missing, outputs):
+            if isinstance(output, Exception):
+                logging.error(f"Error generating rows for chunk: {str(output)}")
+                results[i] = {"nodes": [], "edges": []}
+            else:
+                results[i] = self._store(keys[i], output)
+
+        return results
+
+    async def arun(self, context: str) -> Dict[str, List[dict]]:
+        """Async version of run, for driving many chunks concurrently."""
+        key = self._cache_key(context)
+        if (cached := self._get_cached(key)) is not None:
+            return cached
+
+        result = await self.graph.ainvoke(
+            {
+                "context": context,
+                "nodes": [],
+                "edges": [],
+            },
+            config={"configurable": {"thread_id": 1}},
+        )
+        return self._store(key, {"nodes": result["nodes"], "edges": result["edges"]})
+
+    def _take_complete(
+        self, partial: dict, emitted: Dict[str, int], final: bool
+    ) -> Dict[str, List[dict]]:
+        """
+        Return rows of a partially parsed response that have not been emitted yet.
+
+        While streaming, the last item of a list may still be incomplete, so it is held
+        back until a later item follows it. A list is complete once a later key has
+        started (the parser keeps keys in the order the model writes them) or the
+        response has ended. Edges are held back until the node list is complete, so
+        no edge is emitted before a node it points to.
+        """
+        keys = list(partial) if isinstance(partial, dict) else []
+
+        def is_complete(field: str) -> bool:
+            return final or (field in keys and keys.index(field) < len(keys) - 1)
+
+        specs = {}
+        for field, spec in (("nodes", NodeSpec), ("edges", EdgeSpec)):
+            items = partial.get(field) or [] if keys else []
+            if field == "edges" and not is_complete("nodes"):
+                done = emitted[field]
+            else:
+                done = len(items) if is_complete(field) else len(items) - 1
+            new_items = items[emitted[field] : done]
+            emitted[field] = max(emitted[field], done)
+
+            specs[field] = []
+            for item in new_items:
+                try:
+                    specs[field].append(spec.model_validate(item))
+                except ValidationError:
+                    logging.warning(f"Skipping malformed {field[:-1]}: {item}")
+
+        return self._to_rows(ExtractedGraph(nodes=specs["nodes"], edges=specs["edges"]))
+
+    async def astream_rows(self, context: str) -> AsyncIterator[Dict[str, List[dict]]]:
+        """
+        Yield rows while the model is still generating, as soon as each one is complete.
+
+        Edges are only yielded once the node list is complete, so the endpoints of an
+        edge are always yielded before, or together with, the edge. If streaming fails,
+        even midway, the whole chunk goes through arun and its fallback model instead;
+        rows yielded again are absorbed by the MERGE-based writes.
+        """
+        key = self._cache_key(context)
+        if (cached := self._get_cached(key)) is not None:
+            yield cached
+            return
+
+        emitted = {"nodes": 0, "edges": 0}
+        collected: Dict[str, List[dict]] = {"nodes": [], "edges": []}
+        partial: dict = {}
+
+        try:
+            async for partial in self.stream_chain.astream({"context": context}):
+                rows = self._take_complete(partial, emitted, final=False)
+                if rows["nodes"] or rows["edges"]:
+                    collected["nodes"].extend(rows["nodes"])
+                    collected["edges"].extend(rows["edges"])
+                    yield rows
+        except Exception as e:
+            logging.error(f"Error streaming rows for chunk, retrying without streaming: {str(e)}")
+            yield await self.arun(context)
+            return
+
+        rows = self._take_complete(partial, emitted, final=True)
+        collected["nodes"].extend(rows["nodes"])
+        collected["edges"].extend(rows["edges"])
+        self._store(key, collected)
+        if rows["nodes"] or rows["edges"]:
+            yield rows
@@ -1,40 +1,62 @@
+import asyncio
 import logging
 import os
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from dotenv import load_dotenv
 
 from config.config import get_config
 
-from .data_pipe import DataPipe
+from .data_pipe import STREAM_WRITE_BATCH_SIZE, DataPipe
 
 
-def process_chunk(chunk: str, pipe: DataPipe) -> str:
-    """Process a single document chunk."""
+async def process_chunk(chunk: str, pipe: DataPipe, semaphore: asyncio.Semaphore) -> int:
+    """Stream rows from a single document chunk to the writer as they are generated."""
+    count = 0
     try:
-        pipe_response = "".join(
-            pipe_element for pipe_element in pipe.llm_pipe.run(chunk.strip("|"))
-        )
-        pipe.execute_cypher(pipe_response)
-        return pipe_response
+        async with semaphore:
+            async for rows in pipe.llm_pipe.astream_rows(chunk.strip("|")):
+                # add_rows blocks while the writer thread is behind, so keep it off the loop
+                await asyncio.to_thread(
+                    pipe.add_rows, rows["nodes"], rows["edges"], STREAM_WRITE_BATCH_SIZE
+                )
+                count += len(rows["nodes"]) + len(rows["edges"])
     except Exception as e:
         logging.error(f"Error processing chunk: {str(e)}")
-        return ""
+
+    return count
+
+
+async def process_all_chunks(pipe: DataPipe, concurrency: int) -> int:
+    """
+    Run LLM extraction for every loaded chunk and return the number of successes.
+
+    Rows go through the pipe's single writer thread, which serialises the Neo4j
+    writes while the LLM calls feeding it run concurrently.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    try:
+        results = await asyncio.gather(
+            *(process_chunk(chunk, pipe, semaphore) for chunk in pipe.docs_data)
+        )
+    finally:
+        await asyncio.to_thread(pipe.flush)
+
+    return sum(1 for result in results if result)
 
 
 def main():
     if len(sys.argv) < 3:
-        print("Usage: python main.py <input_dir> <num_threads> [--clear-db]")
+        print("Usage: python main.py <input_dir> <concurrency> [--clear-db]")
         sys.exit(1)
 
     input_dir = sys.argv[1]
     try:
-        num_threads = int(sys.argv[2])
-        if num_threads < 1:
-            raise ValueError("Number of threads must be positive")
+        concurrency = int(sys.argv[2])
+        if concurrency < 1:
+            raise ValueError("Concurrency must be positive")
     except ValueError as e:
-        print(f"Invalid number of threads: {e}")
+        print(f"Invalid concurrency: {e}")
         sys.exit(1)
 
     clear_db = "--clear-db" in sys.argv
@@ -58,35 +80,18 @@ def main():
         logging.error(f"Failed to initialize DataPipe: {str(e)}")
         return
 
-    if clear_db:
-        try:
+    try:
+        if clear_db:
             pipe.clear_database()
-            logging.info("Database cleared successfully")
-        except Exception as e:
-            logging.error(f"Failed to clear database: {str(e)}")
-            return
 
-    try:
         pipe.load_data_from_directory(input_dir)
         if not pipe.docs_data:
             logging.error("No documents were loaded from the input directory")
             return
 
-        logging.info(f"Processing {len(pipe.docs_data)} chunks using {num_threads} threads")
-
-        with ThreadPoolExecutor(max_workers=num_threads) as executor:
-            futures = []
-            for chunk in pipe.docs_data:
-                futures.append(executor.submit(process_chunk, chunk, pipe))
+        logging.info(f"Processing {len(pipe.docs_data)} chunks with concurrency {concurrency}")
 
-            successful_queries = 0
-            for future in as_completed(futures):
-                try:
-                    result = future.result()
-                    if result:
-                        successful_queries += 1
-                except Exception as e:
-                    logging.error(f"Error in thread: {str(e)}")
+        successful_queries = asyncio.run(process_all_chunks(pipe, concurrency))
 
         logging.info(
             f"Successfully processed {successful_queries} out of {len(pipe.docs_data)} chunks"
@@ -94,6 +99,8 @@ def main():
 
     except Exception as e:
         logging.error(f"Error during document processing: {str(e)}")
+    finally:
+        pipe.close()
 
 
 if __name__ == "__main__":
@@ -4,9 +4,11 @@ from langchain_community.document_loaders import PyPDFLoader, TextLoader
 class PDFLoader:
     def __init__(self, file_path: str):
         self.file_path = file_path
-        self.pdf_loader = PyPDFLoader(file_path)
-        self.txt_loader = TextLoader(file_path)
 
     def load_document(self) -> str:
-        loader = self.pdf_loader if self.file_path.endswith(".pdf") else self.txt_loader
-        return "".join([page.page_content for page in loader.load()])
+        # Only build the loader we need, and stream pages instead of materialising them.
+        if self.file_path.endswith(".pdf"):
+            loader = PyPDFLoader(self.file_path)
+        else:
+            loader = TextLoader(self.file_path)
+        return "".join(page.page_content for page in loader.lazy_load())
@@ -0,0 +1,197 @@
+"""Asynchronous batching of knowledge graph queries sent to the MCP server."""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import orjson
+from fastmcp import Client
+from fastmcp.exceptions import ToolError
+
+logger = logging.getLogger(__name__)
+
+TOOL_NAME = "knowledge_graph_tool"
+BATCH_TOOL_NAME = "knowledge_graph_tool_batch"
+
+# (user_input, trace_id, future resolved with the tool's text output)
+PendingQuery = Tuple[str, Optional[str], asyncio.Future]
+
+
+def _result_text(result) -> str:
+    return "\n".join(item.text for item in result.content if hasattr(item, "text"))
+
+
+def _fail(batch: List[PendingQuery], error: Exception) -> None:
+    """Fail every query in the batch that has not been answered yet."""
+    for _, _, future in batch:
+        if not future.done():
+            future.set_exception(error)
+
+
+class MCPQueryBatcher:
+    """
+    Collects concurrent knowledge graph queries and sends them to the MCP server together.
+
+    A background task takes the first waiting query, keeps accumulating until
+    ``max_batch`` queries are waiting or ``max_wait_ms`` has passed, and then sends
+    the whole group as one ``knowledge_graph_tool_batch`` call. Each caller awaits
+    a future that resolves with its own answer. Servers without the batch tool get
+    the group as individual, concurrent ``knowledge_graph_tool`` calls.
+    """
+
+    def __init__(self, client: Client, max_batch: int = 8, max_wait_ms: float = 10.0):
+        """
+        Initialize the batcher.
+
+        Args:
+            client: MCP client, connected by the caller or on demand per call
+            max_batch: Maximum number of queries sent in one call
+            max_wait_ms: How long the first query of a batch waits for others to join
+        """
+        self._client = client
+        self._max_batch = max_batch
+        self._max_wait = max_wait_ms / 1000
+        self._queue: asyncio.Queue[PendingQuery] = asyncio.Queue()
+        self._batch_supported: Optional[bool] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._dispatches: set = set()
+        self._reconnect_lock = asyncio.Lock()
+        self._generation = 0  # bumped on every reconnect
+
+    def start(self) -> None:
+        """Start the background task that groups queued queries into batches."""
+        self._worker = asyncio.create_task(self._collect())
+
+    async def stop(self) -> None:
+        """Stop collecting and fail every query that has not been sent yet."""
+        if self._worker:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+        await asyncio.gather(*self._dispatches, return_exceptions=True)
+        pending = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        _fail(pending, RuntimeError("MCP query batcher stopped"))
+
+    async def query(self, user_input: str, trace_id: Optional[str] = None) -> str:
+        """
+        Queue a knowledge graph query and wait for its answer.
+
+        Args:
+            user_input: User's question
+            trace_id: Optional trace ID for tracking
+
+        Returns:
+            Knowledge graph data as JSON string
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((user_input, trace_id, future))
+        return await future
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self._max_wait
+            try:
+                while len(batch) < self._max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Queries already taken off the queue would otherwise never be answered
+                _fail(batch, RuntimeError("MCP query batcher stopped"))
+                raise
+
+            # Dispatch in the background so the next batch accumulates meanwhile
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _on_client(self, request: Callable[[Client], Awaitable]):
+        generation = self._generation
+        if not self._client.is_connected():
+            # The MCP server was unreachable at startup or a reconnect failed
+            await self._reconnect(generation)
+            return await request(self._client)
+
+        try:
+            return await request(self._client)
+        except ToolError:
+            raise  # The tool itself failed; the session is fine
+        except Exception as e:
+            # The session may have died, e.g. because the MCP server restarted
+            logger.warning(f"MCP call failed, reconnecting and retrying once: {e}")
+            await self._reconnect(generation)
+            return await request(self._client)
+
+    async def _reconnect(self, generation: int) -> None:
+        """Replace the client's session, unless another call already did since generation."""
+        async with self._reconnect_lock:
+            if generation != self._generation and self._client.is_connected():
+                return
+            try:
+                await self._client.close()
+            except Exception as e:
+                logger.debug(f"Error closing the old MCP session: {e}")
+            await self._client.__aenter__()
+            self._generation += 1
+            logger.info("Reconnected to MCP server")
+
+    async def _call_tool(self, name: str, arguments: dict):
+        return await self._on_client(lambda client: client.call_tool(name, arguments))
+
+    async def _supports_batch(self) -> bool:
+        if self._batch_supported is None:
+            tools = await self._on_client(lambda client: client.list_tools())
+            self._batch_supported = any(tool.name == BATCH_TOOL_NAME for tool in tools)
+            if not self._batch_supported:
+                logger.info(f"MCP server has no {BATCH_TOOL_NAME}, sending queries one by one")
+        return self._batch_supported
+
+    async def _dispatch(self, batch: List[PendingQuery]) -> None:
+        try:
+            if len(batch) > 1 and await self._supports_batch():
+                await self._send_batch(batch)
+            else:
+                await asyncio.gather(*(self._send_one(*query) for query in batch))
+        except Exception as e:
+            _fail(batch, e)
+
+    async def _send_one(self, user_input: str, trace_id: Optional[str], future) -> None:
+        try:
+            result = await self._call_tool(
+                TOOL_NAME, {"user_input": user_input, "trace_id": trace_id}
+            )
+            if not future.done():
+                future.set_result(_result_text(result))
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+
+    async def _send_batch(self, batch: List[PendingQuery]) -> None:
+        queries = [
+            {"user_input": user_input, "trace_id": trace_id} for user_input, trace_id, _ in batch
+        ]
+        result = await self._call_tool(BATCH_TOOL_NAME, {"queries": queries})
+        answers = orjson.loads(_result_text(result))
+        logger.debug(f"Sent {len(batch)} knowledge graph queries in one MCP call")
+        if not isinstance(answers, list):
+            raise RuntimeError(f"Unexpected {BATCH_TOOL_NAME} response: {answers!r}")
+
+        for (_, _, future), answer in zip(batch, answers):
+            if future.done():
+                continue
+            if isinstance(answer, dict) and "answer" in answer:
+                future.set_result(answer["answer"])
+            elif isinstance(answer, dict) and "error" in answer:
+                future.set_exception(RuntimeError(answer["error"]))
+            else:
+                future.set_exception(RuntimeError(f"Malformed answer: {answer!r}"))
+
+        # A short answer list must not leave the remaining callers waiting forever
+        _fail(batch, RuntimeError(f"{BATCH_TOOL_NAME} returned no answer for this query"))
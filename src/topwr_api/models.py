@@ -1,11 +1,26 @@
 """Data models for conversation management."""
 
-from datetime import datetime
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import List, Optional
+from itertools import islice
+from typing import Deque, Iterator, List, Optional
 from uuid import uuid4
 
-from pydantic import BaseModel, Field
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    PrivateAttr,
+    field_serializer,
+    field_validator,
+)
+
+# Oldest messages are dropped once a session reaches this size
+MAX_SESSION_MESSAGES = 10_000
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
 
 
 class MessageRole(str, Enum):
@@ -19,14 +34,33 @@ class MessageRole(str, Enum):
 class Message(BaseModel):
     """Single message in a conversation."""
 
+    model_config = ConfigDict(frozen=True)
+
     id: str = Field(default_factory=lambda: uuid4().hex)
     role: MessageRole
     content: str
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    # Stored as epoch nanoseconds; converted to ISO 8601 only when serialized
+    timestamp: int = Field(default_factory=time.time_ns)
     metadata: Optional[dict] = Field(default_factory=dict)
 
-    class Config:
-        json_encoders = {datetime: lambda v: v.isoformat()}
+    @field_validator("timestamp", mode="before")
+    @classmethod
+    def parse_timestamp(cls, value):
+        """Accept the serialized ISO form so dumped messages validate back."""
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        if isinstance(value, datetime):
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            # Integer math: a float of epoch nanoseconds cannot hold every microsecond
+            delta = value - _EPOCH
+            return (delta.days * 86400 + delta.seconds) * 10**9 + delta.microseconds * 1000
+        return value
+
+    @field_serializer("timestamp")
+    def serialize_timestamp(self, timestamp: int) -> str:
+        seconds, nanoseconds = divmod(timestamp, 10**9)
+        return (_EPOCH + timedelta(seconds=seconds, microseconds=nanoseconds // 1000)).isoformat()
 
 
 class ConversationSession(BaseModel):
@@ -34,15 +68,23 @@ class ConversationSession(BaseModel):
 
     session_id: str = Field(default_factory=lambda: uuid4().hex)
     user_id: str
-    messages: List[Message] = Field(default_factory=list)
+    messages: Deque[Message] = Field(default_factory=lambda: deque(maxlen=MAX_SESSION_MESSAGES))
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     metadata: dict = Field(default_factory=dict)
     is_active: bool = True
+    # Position in the owning manager's write order; compared instead of updated_at
+    _update_seq: int = PrivateAttr(default=0)
 
     class Config:
         json_encoders = {datetime: lambda v: v.isoformat()}
 
+    @field_validator("messages")
+    @classmethod
+    def cap_history(cls, messages: Deque[Message]) -> Deque[Message]:
+        """Keep the history bounded when a session is rebuilt from serialized data."""
+        return deque(messages, maxlen=MAX_SESSION_MESSAGES)
+
     def add_message(
         self, role: MessageRole, content: str, metadata: Optional[dict] = None
     ) -> Message:
@@ -52,19 +94,28 @@ class ConversationSession(BaseModel):
         self.updated_at = datetime.utcnow()
         return message
 
+    def iter_recent_messages(self, limit: Optional[int] = None) -> Iterator[Message]:
+        """Iterate over the last N messages (or all of them) without copying the history."""
+        if not limit:
+            return iter(self.messages)
+        # Walk from the right end so only the requested messages are visited
+        recent = list(islice(reversed(self.messages), limit))
+        return reversed(recent)
+
     def get_conversation_history(self, limit: Optional[int] = None) -> List[Message]:
         """Get conversation history, optionally limited to last N messages."""
-        if limit:
-            return self.messages[-limit:]
-        return self.messages
+        return list(self.iter_recent_messages(limit))
+
+    def get_messages(self, offset: int = 0, limit: Optional[int] = None) -> List[Message]:
+        """Get a page of the conversation history, oldest first."""
+        stop = offset + limit if limit else None
+        return list(islice(self.messages, offset, stop))
 
     def get_context_window(self, max_messages: int = 10) -> str:
         """Get formatted conversation context for LLM."""
-        recent_messages = self.get_conversation_history(limit=max_messages)
-        context = []
-        for msg in recent_messages:
-            context.append(f"{msg.role.value}: {msg.content}")
-        return "\n".join(context)
+        return "\n".join(
+            f"{msg.role.value}: {msg.content}" for msg in self.iter_recent_messages(max_messages)
+        )
 
 
 class ChatRequest(BaseModel):
@@ -90,6 +141,16 @@ class ChatResponse(BaseModel):
         json_encoders = {datetime: lambda v: v.isoformat()}
 
 
+class SessionSummary(BaseModel):
+    """Lightweight per-session listing entry, kept up to date on every write."""
+
+    session_id: str
+    message_count: int
+    created_at: datetime
+    updated_at: datetime
+    is_active: bool
+
+
 class SessionInfo(BaseModel):
     """Session information model."""
 
@@ -0,0 +1,550 @@
+"""Redis-backed session storage shared by all API worker processes."""
+
+import logging
+import time
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional, Set
+
+import orjson
+from redis import Redis
+from redis.client import Pipeline
+
+from .models import (
+    MAX_SESSION_MESSAGES,
+    ConversationSession,
+    Message,
+    MessageRole,
+    SessionInfo,
+    SessionSummary,
+)
+
+logger = logging.getLogger(__name__)
+
+# Idle sessions expire after a day; every write pushes the deadline forward
+SESSION_TTL_SECONDS = 24 * 60 * 60
+KEY_PREFIX = "topwr"
+
+
+class RedisSessionManager:
+    """
+    Session manager with the same interface as SessionManager, persisted in Redis.
+
+    Layout (all keys under ``topwr:``):
+        session:{id}           hash with user_id, timestamps, is_active and metadata
+        session:{id}:messages  list of JSON-serialized messages, oldest first
+        user:{uid}:sessions    set of the user's session ids
+        sessions               set of all session ids
+        active_sessions        set of active session ids
+        message_counts         hash of session id -> number of messages
+        session_users          hash of session id -> user id
+        expiry                 sorted set of session ids scored by their expiry time
+        users                  set of user ids with at least one session
+        total_messages         counter
+
+    Session and message keys carry a TTL, mirrored in ``expiry``. Listings and stats
+    first prune every session whose expiry has passed, so the index sets and counters
+    only ever describe live sessions.
+    """
+
+    def __init__(self, url: str):
+        """Connect to Redis at the given URL."""
+        self._redis = Redis.from_url(url, decode_responses=True)
+        self._redis.ping()
+        logger.info("SessionManager initialized with Redis storage")
+
+    @staticmethod
+    def _key(*parts: str) -> str:
+        return ":".join((KEY_PREFIX, *parts))
+
+    def _session_key(self, session_id: str) -> str:
+        return self._key("session", session_id)
+
+    def _messages_key(self, session_id: str) -> str:
+        return self._key("session", session_id, "messages")
+
+    def _user_key(self, user_id: str) -> str:
+        return self._key("user", user_id, "sessions")
+
+    @staticmethod
+    def _to_hash(session: ConversationSession) -> dict:
+        return {
+            "user_id": session.user_id,
+            "created_at": session.created_at.isoformat(),
+            "updated_at": session.updated_at.isoformat(),
+            "is_active": int(session.is_active),
+            "metadata": orjson.dumps(session.metadata).decode(),
+        }
+
+    @staticmethod
+    def _from_hash(
+        session_id: str, data: dict, messages: Iterable[str] = ()
+    ) -> ConversationSession:
+        return ConversationSession(
+            session_id=session_id,
+            user_id=data["user_id"],
+            messages=[Message.model_validate_json(raw) for raw in messages],
+            created_at=datetime.fromisoformat(data["created_at"]),
+            updated_at=datetime.fromisoformat(data["updated_at"]),
+            metadata=orjson.loads(data["metadata"]),
+            is_active=data["is_active"] == "1",
+        )
+
+    def _load_sessions(self, session_ids: List[str]) -> List[ConversationSession]:
+        """Load several sessions in one round-trip and prune ids that have expired."""
+        pipe = self._redis.pipeline(transaction=False)
+        for session_id in session_ids:
+            pipe.hgetall(self._session_key(session_id))
+            pipe.lrange(self._messages_key(session_id), 0, -1)
+        replies = pipe.execute()
+
+        sessions, expired = [], []
+        for session_id, data, messages in zip(session_ids, replies[::2], replies[1::2]):
+            if data:
+                sessions.append(self._from_hash(session_id, data, messages))
+            else:
+                expired.append(session_id)
+
+        if expired:
+            self._prune(expired)
+        return sessions
+
+    def _prune(self, session_ids: List[str]) -> List[str]:
+        """
+        Remove sessions together with every index entry and counter that refers to them.
+
+        Returns:
+            Ids removed by this call; ids another caller already pruned are skipped
+        """
+        # Claim the ids first: HDEL succeeds for exactly one caller, so concurrent
+        # prunes of the same session never subtract its messages twice
+        pipe = self._redis.pipeline(transaction=False)
+        for session_id in session_ids:
+            pipe.hget(self._key("session_users"), session_id)
+            pipe.hdel(self._key("session_users"), session_id)
+        replies = pipe.execute()
+        claimed = {
+            session_id: user_id
+            for session_id, user_id, deleted in zip(session_ids, replies[::2], replies[1::2])
+            if deleted
+        }
+        ids = list(claimed)
+
+        def remove(pipe) -> None:
+            # Watching the session hashes makes a concurrent add_message force a re-read
+            counts = pipe.hmget(self._key("message_counts"), ids) if ids else []
+            pipe.multi()
+            for session_id, user_id in claimed.items():
+                pipe.delete(self._session_key(session_id), self._messages_key(session_id))
+                pipe.srem(self._user_key(user_id), session_id)
+            # Set removals are idempotent, so unclaimed ids are cleared from them as well
+            pipe.srem(self._key("sessions"), *session_ids)
+            pipe.srem(self._key("active_sessions"), *session_ids)
+            pipe.zrem(self._key("expiry"), *session_ids)
+            if ids:
+                pipe.hdel(self._key("message_counts"), *ids)
+                pipe.decrby(self._key("total_messages"), sum(int(count or 0) for count in counts))
+
+        self._redis.transaction(remove, *map(self._session_key, session_ids))
+        if claimed:
+            self._prune_users(set(claimed.values()))
+            logger.debug(f"Pruned {len(ids)} sessions from the index")
+        return ids
+
+    def _prune_users(self, user_ids: Set[str]) -> None:
+        """Drop users whose last session is gone from the ``users`` set."""
+        user_ids = list(user_ids)
+
+        def remove(pipe) -> None:
+            sizes = [pipe.scard(self._user_key(user_id)) for user_id in user_ids]
+            empty = [user_id for user_id, size in zip(user_ids, sizes) if not size]
+            pipe.multi()
+            if empty:
+                pipe.srem(self._key("users"), *empty)
+
+        # A session created for one of these users meanwhile makes the check run again
+        self._redis.transaction(remove, *map(self._user_key, user_ids))
+
+    def _prune_expired(self) -> None:
+        expired = self._redis.zrangebyscore(self._key("expiry"), "-inf", time.time())
+        if expired:
+            self._prune(expired)
+
+    def _write_if_exists(self, session_id: str, write: Callable[[Pipeline], None]) -> bool:
+        """
+        Run ``write`` as a MULTI block only if the session still exists.
+
+        The session's keys are WATCHed from the existence check until EXEC, so a
+        concurrent delete makes the check run again instead of leaving a partial hash.
+        ``write`` may read through the pipeline before it calls ``pipe.multi()``.
+        """
+
+        def attempt(pipe: Pipeline) -> bool:
+            if not pipe.exists(self._session_key(session_id)):
+                return False
+            write(pipe)
+            return True
+
+        return self._redis.transaction(
+            attempt,
+            self._session_key(session_id),
+            self._messages_key(session_id),
+            value_from_callable=True,
+        )
+
+    def _touch(self, pipe, session_id: str) -> None:
+        pipe.expire(self._session_key(session_id), SESSION_TTL_SECONDS)
+        pipe.expire(self._messages_key(session_id), SESSION_TTL_SECONDS)
+        pipe.zadd(self._key("expiry"), {session_id: time.time() + SESSION_TTL_SECONDS})
+
+    def create_session(self, user_id: str, metadata: Optional[dict] = None) -> ConversationSession:
+        """
+        Create a new conversation session for a user.
+
+        Args:
+            user_id: Unique identifier for the user
+            metadata: Optional metadata for the session
+
+        Returns:
+            New ConversationSession instance
+        """
+        session = ConversationSession(user_id=user_id, metadata=metadata or {})
+
+        pipe = self._redis.pipeline()
+        pipe.hset(self._session_key(session.session_id), mapping=self._to_hash(session))
+        self._touch(pipe, session.session_id)
+        pipe.sadd(self._user_key(user_id), session.session_id)
+        pipe.sadd(self._key("sessions"), session.session_id)
+        pipe.sadd(self._key("active_sessions"), session.session_id)
+        pipe.hset(self._key("session_users"), session.session_id, user_id)
+        pipe.sadd(self._key("users"), user_id)
+        pipe.execute()
+
+        logger.info(f"Created session {session.session_id} for user {user_id}")
+        return session
+
+    def get_session(self, session_id: str) -> Optional[ConversationSession]:
+        """
+        Retrieve a session by ID.
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            ConversationSession if found, None otherwise
+        """
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.hgetall(self._session_key(session_id))
+        pipe.lrange(self._messages_key(session_id), 0, -1)
+        data, messages = pipe.execute()
+        if not data:
+            return None
+        return self._from_hash(session_id, data, messages)
+
+    def update_session(self, session: ConversationSession) -> bool:
+        """
+        Update an existing session's attributes (messages are stored separately).
+
+        Args:
+            session: Updated session object
+
+        Returns:
+            True if successful, False if session not found
+        """
+        session.updated_at = datetime.utcnow()
+
+        def write(pipe: Pipeline) -> None:
+            pipe.multi()
+            pipe.hset(self._session_key(session.session_id), mapping=self._to_hash(session))
+            self._touch(pipe, session.session_id)
+            if session.is_active:
+                pipe.sadd(self._key("active_sessions"), session.session_id)
+            else:
+                pipe.srem(self._key("active_sessions"), session.session_id)
+
+        if not self._write_if_exists(session.session_id, write):
+            return False
+        logger.debug(f"Updated session {session.session_id}")
+        return True
+
+    def delete_session(self, session_id: str) -> bool:
+        """
+        Delete a session by ID.
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            True if deleted, False if not found
+        """
+        if not self._prune([session_id]):
+            return False
+
+        logger.info(f"Deleted session {session_id}")
+        return True
+
+    def _user_session_ids(self, user_id: str, active_only: bool) -> List[str]:
+        if active_only:
+            # Active ids are the intersection with the global active set, computed in Redis
+            return list(self._redis.sinter(self._user_key(user_id), self._key("active_sessions")))
+        return list(self._redis.smembers(self._user_key(user_id)))
+
+    def get_user_sessions(
+        self, user_id: str, active_only: bool = True
+    ) -> List[ConversationSession]:
+        """
+        Get all sessions for a specific user.
+
+        Args:
+            user_id: User identifier
+            active_only: If True, return only active sessions
+
+        Returns:
+            List of ConversationSession objects
+        """
+        self._prune_expired()
+        session_ids = self._user_session_ids(user_id, active_only)
+        if not session_ids:
+            return []
+
+        return self._load_sessions(session_ids)
+
+    def get_user_session_summaries(
+        self, user_id: str, active_only: bool = True
+    ) -> List[SessionSummary]:
+        """
+        Get listing entries for a user's sessions without loading their messages.
+
+        Args:
+            user_id: User identifier
+            active_only: If True, return only active sessions
+
+        Returns:
+            List of SessionSummary objects
+        """
+        self._prune_expired()
+        session_ids = self._user_session_ids(user_id, active_only)
+        if not session_ids:
+            return []
+
+        pipe = self._redis.pipeline(transaction=False)
+        for session_id in session_ids:
+            pipe.hgetall(self._session_key(session_id))
+            pipe.llen(self._messages_key(session_id))
+        replies = pipe.execute()
+
+        summaries, expired = [], []
+        for session_id, data, message_count in zip(session_ids, replies[::2], replies[1::2]):
+            if not data:
+                expired.append(session_id)
+                continue
+            summaries.append(
+                SessionSummary(
+                    session_id=session_id,
+                    message_count=message_count,
+                    created_at=datetime.fromisoformat(data["created_at"]),
+                    updated_at=datetime.fromisoformat(data["updated_at"]),
+                    is_active=data["is_active"] == "1",
+                )
+            )
+
+        if expired:
+            self._prune(expired)
+        return summaries
+
+    def get_active_session(self, user_id: str) -> Optional[ConversationSession]:
+        """
+        Get the most recent active session for a user.
+
+        Args:
+            user_id: User identifier
+
+        Returns:
+            Most recent active ConversationSession or None
+        """
+        sessions = self.get_user_sessions(user_id, active_only=True)
+        return max(sessions, key=lambda s: s.updated_at, default=None)
+
+    def add_message(
+        self, session_id: str, role: MessageRole, content: str, metadata: Optional[dict] = None
+    ) -> Optional[Message]:
+        """
+        Add a message to a session.
+
+        Args:
+            session_id: Session identifier
+            role: Message role (user/assistant/system)
+            content: Message content
+            metadata: Optional message metadata
+
+        Returns:
+            Created Message object or None if session not found
+        """
+        message = Message(role=role, content=content, metadata=metadata or {})
+
+        def write(pipe: Pipeline) -> None:
+            stored = pipe.llen(self._messages_key(session_id))
+            pipe.multi()
+            pipe.rpush(self._messages_key(session_id), message.model_dump_json())
+            pipe.ltrim(self._messages_key(session_id), -MAX_SESSION_MESSAGES, -1)
+            pipe.hset(self._session_key(session_id), "updated_at", datetime.utcnow().isoformat())
+            self._touch(pipe, session_id)
+            # A full history evicts its oldest message, so the counts do not change
+            pipe.hset(
+                self._key("message_counts"), session_id, min(stored + 1, MAX_SESSION_MESSAGES)
+            )
+            if stored < MAX_SESSION_MESSAGES:
+                pipe.incr(self._key("total_messages"))
+
+        if not self._write_if_exists(session_id, write):
+            logger.warning(f"Session {session_id} not found")
+            return None
+
+        logger.debug(f"Added {role.value} message to session {session_id}")
+        return message
+
+    def get_conversation_history(
+        self, session_id: str, limit: Optional[int] = None
+    ) -> List[Message]:
+        """
+        Get the last N messages of a session without loading the whole history.
+
+        Args:
+            session_id: Session identifier
+            limit: Number of most recent messages to return, all if None
+
+        Returns:
+            List of messages, oldest first (empty if the session does not exist)
+        """
+        start = -limit if limit else 0
+        raw_messages = self._redis.lrange(self._messages_key(session_id), start, -1)
+        return [Message.model_validate_json(raw) for raw in raw_messages]
+
+    def get_messages(
+        self, session_id: str, offset: int = 0, limit: Optional[int] = None
+    ) -> List[Message]:
+        """
+        Get a page of a session's messages with a single LRANGE.
+
+        Args:
+            session_id: Session identifier
+            offset: Number of oldest messages to skip
+            limit: Maximum number of messages to return, all remaining if None
+
+        Returns:
+            List of messages, oldest first (empty if the session does not exist)
+        """
+        stop = offset + limit - 1 if limit else -1
+        raw_messages = self._redis.lrange(self._messages_key(session_id), offset, stop)
+        return [Message.model_validate_json(raw) for raw in raw_messages]
+
+    def deactivate_session(self, session_id: str) -> bool:
+        """
+        Mark a session as inactive.
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            True if successful, False if session not found
+        """
+
+        def write(pipe: Pipeline) -> None:
+            pipe.multi()
+            pipe.hset(
+                self._session_key(session_id),
+                mapping={"is_active": 0, "updated_at": datetime.utcnow().isoformat()},
+            )
+            pipe.srem(self._key("active_sessions"), session_id)
+
+        if not self._write_if_exists(session_id, write):
+            return False
+        logger.info(f"Deactivated session {session_id}")
+        return True
+
+    def get_session_info(self, session_id: str) -> Optional[SessionInfo]:
+        """
+        Get session information without full message history.
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            SessionInfo object or None if not found
+        """
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.hgetall(self._session_key(session_id))
+        pipe.llen(self._messages_key(session_id))
+        data, message_count = pipe.execute()
+        if not data:
+            return None
+
+        return SessionInfo(
+            session_id=session_id,
+            user_id=data["user_id"],
+            message_count=message_count,
+            created_at=datetime.fromisoformat(data["created_at"]),
+            updated_at=datetime.fromisoformat(data["updated_at"]),
+            is_active=data["is_active"] == "1",
+        )
+
+    def get_all_sessions(self) -> List[SessionInfo]:
+        """
+        Get information about all sessions.
+
+        Returns:
+            List of SessionInfo objects
+        """
+        self._prune_expired()
+        session_ids = list(self._redis.smembers(self._key("sessions")))
+        return [
+            SessionInfo(
+                session_id=s.session_id,
+                user_id=s.user_id,
+                message_count=len(s.messages),
+                created_at=s.created_at,
+                updated_at=s.updated_at,
+                is_active=s.is_active,
+            )
+            for s in self._load_sessions(session_ids)
+        ]
+
+    def clear_all_sessions(self) -> int:
+        """
+        Clear all sessions (for testing/reset).
+
+        Returns:
+            Number of sessions cleared
+        """
+        count = self._redis.scard(self._key("sessions"))
+        keys = list(self._redis.scan_iter(match=self._key("*"), count=1000))
+        if keys:
+            self._redis.delete(*keys)
+        logger.warning(f"Cleared all {count} sessions")
+        return count
+
+    def get_stats(self) -> dict:
+        """
+        Get statistics about current sessions from the maintained index sets and counters.
+
+        Returns:
+            Dictionary with session statistics
+        """
+        self._prune_expired()
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.scard(self._key("sessions"))
+        pipe.scard(self._key("active_sessions"))
+        pipe.get(self._key("total_messages"))
+        pipe.scard(self._key("users"))
+        total_sessions, active_sessions, total_messages, unique_users = pipe.execute()
+        total_messages = int(total_messages or 0)
+
+        return {
+            "total_sessions": total_sessions,
+            "active_sessions": active_sessions,
+            "inactive_sessions": total_sessions - active_sessions,
+            "total_messages": total_messages,
+            "unique_users": unique_users,
+            "avg_messages_per_session": (
+                total_messages / total_sessions if total_sessions > 0 else 0
+            ),
+        }
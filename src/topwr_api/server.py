@@ -1,20 +1,29 @@
 """FastAPI application for ToPWR MCP integration."""
 
+import asyncio
+import functools
 import logging
 import os
+import time
 import uuid
+from collections import defaultdict
 from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, TypeVar, Union
 
+import orjson
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, HTTPException, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastmcp import Client
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_openai import ChatOpenAI
 
 from ..config.config import get_config
+from .mcp_batcher import MCPQueryBatcher
 from .models import ChatRequest, ChatResponse, MessageRole
-from .session_manager import SessionManager
+from .redis_session_manager import RedisSessionManager
+from .session_manager import SessionManager, create_session_manager
 
 load_dotenv()
 
@@ -24,8 +33,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Page sizes for history and session listings: the default and the largest allowed
+DEFAULT_HISTORY_PAGE = 50
+MAX_HISTORY_PAGE = 500
+DEFAULT_SESSIONS_PAGE = 100
+MAX_SESSIONS_PAGE = 500
+
 # Configuration
 config = get_config()
+# Debug mode exposes the API docs and logs every request; both cost time per request
+debug = os.getenv("TOPWR_API_DEBUG", "").lower() in ("1", "true", "yes")
+# Per-route latency accounting, reported under route_timings in /api/stats
+profile_routes = os.getenv("TOPWR_API_PROFILE_ROUTES", "").lower() in ("1", "true", "yes")
 
 # MCP Client setup
 mcp_host = os.getenv("MCP_HOST", config.servers.mcp.host)
@@ -56,7 +75,16 @@ else:
     logger.warning("No LLM API key found. Chat will return raw knowledge graph data.")
 
 # Global session manager
-session_manager: SessionManager = None
+session_manager: Union[SessionManager, RedisSessionManager] = None
+
+T = TypeVar("T")
+
+
+async def _run(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Run a blocking session store call in the default thread pool, off the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(
+        None, functools.partial(fn, *args, **kwargs)
+    )
 
 
 @asynccontextmanager
@@ -66,15 +94,38 @@ async def lifespan(app: FastAPI):
 
     # Startup
     logger.info("Starting ToPWR API service...")
+    if os.getenv("TOPWR_API_DEBUG_LOOP"):
+        # Development aid: log every callback that holds the event loop for over 10 ms
+        loop = asyncio.get_running_loop()
+        loop.set_debug(True)
+        loop.slow_callback_duration = 0.01
     logger.info(f"MCP Server URL: {mcp_url}")
-    session_manager = SessionManager()
+    session_manager = create_session_manager()
     logger.info("Session manager initialized")
 
+    # Keep one MCP connection open for the whole lifetime instead of one per chat
+    try:
+        await mcp_client.__aenter__()
+        logger.info("Connected to MCP server")
+    except Exception as e:
+        logger.warning(f"Could not connect to MCP server, will connect per request: {e}")
+
+    # Queries from concurrent chats are grouped into shared MCP calls
+    app.state.mcp_batcher = MCPQueryBatcher(
+        mcp_client,
+        max_batch=int(os.getenv("TOPWR_API_MCP_MAX_BATCH", "8")),
+        max_wait_ms=float(os.getenv("TOPWR_API_MCP_MAX_WAIT_MS", "10")),
+    )
+    app.state.mcp_batcher.start()
+
     yield
 
     # Shutdown
     logger.info("Shutting down ToPWR API service...")
-    stats = session_manager.get_stats()
+    await app.state.mcp_batcher.stop()
+    if mcp_client.is_connected():
+        await mcp_client.__aexit__(None, None, None)
+    stats = await _run(session_manager.get_stats)
     logger.info(f"Final stats: {stats}")
 
 
@@ -84,28 +135,56 @@ app = FastAPI(
     description="API for integrating ToPWR application with MCP Knowledge Graph",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+    docs_url="/docs" if debug else None,
+    redoc_url=None,
+    openapi_url="/openapi.json" if debug else None,
 )
 
 # Configure CORS
-config = get_config()
 cors_origins = config.servers.topwr_api.cors_origins
 if cors_origins == "*":
     allow_origins = ["*"]
 else:
     allow_origins = [origin.strip() for origin in cors_origins.split(",")]
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=allow_origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Behind a same-origin proxy CORS is not needed, and every middleware layer costs per request
+if os.getenv("TOPWR_API_DISABLE_CORS", "").lower() in ("1", "true", "yes"):
+    logger.info("CORS middleware disabled")
+else:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=allow_origins,
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "DELETE"],
+        allow_headers=["Content-Type"],
+    )
+
+# Route path -> [request count, total seconds, slowest seconds], per worker process
+route_timings: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0, 0.0])
+
+
+async def record_route_timing(request: Request, call_next):
+    """Accumulate the time each route takes to produce its response."""
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+
+    route = request.scope.get("route")
+    timing = route_timings[route.path if route else "<unmatched>"]
+    timing[0] += 1
+    timing[1] += elapsed
+    timing[2] = max(timing[2], elapsed)
+    return response
+
+
+if profile_routes:
+    app.middleware("http")(record_route_timing)
 
 
 async def query_mcp_knowledge_graph(user_input: str, trace_id: str = None) -> str:
     """
-    Query the MCP server's knowledge graph tool.
+    Query the MCP server's knowledge graph tool, batched with concurrent chats.
 
     Args:
         user_input: User's question
@@ -114,15 +193,7 @@ async def query_mcp_knowledge_graph(user_input: str, trace_id: str = None) -> st
     Returns:
         Knowledge graph data as JSON string
     """
-    async with mcp_client:
-        result = await mcp_client.call_tool(
-            "knowledge_graph_tool",
-            {
-                "user_input": user_input,
-                "trace_id": trace_id,
-            },
-        )
-        return "\n".join(item.text for item in result.content if hasattr(item, "text"))
+    return await app.state.mcp_batcher.query(user_input, trace_id=trace_id)
 
 
 async def generate_final_answer(user_input: str, kg_data: str, history: str = "") -> str:
@@ -161,7 +232,7 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    stats = session_manager.get_stats()
+    stats = await _run(session_manager.get_stats)
     return {"status": "healthy", "session_stats": stats}
 
 
@@ -179,7 +250,8 @@ async def chat(request: ChatRequest):
     try:
         # Get or create session
         if request.session_id:
-            session = session_manager.get_session(request.session_id)
+            # Only the ID is needed here, so skip loading the full message history
+            session = await _run(session_manager.get_session_info, request.session_id)
             if not session:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
@@ -187,26 +259,30 @@ async def chat(request: ChatRequest):
                 )
             logger.info(f"Using existing session {session.session_id} for user {request.user_id}")
         else:
-            session = session_manager.create_session(
-                user_id=request.user_id, metadata=request.metadata
+            session = await _run(
+                session_manager.create_session, user_id=request.user_id, metadata=request.metadata
             )
             logger.info(f"Created new session {session.session_id} for user {request.user_id}")
 
-        # Add user message to conversation
-        session_manager.add_message(
-            session_id=session.session_id,
-            role=MessageRole.USER,
-            content=request.message,
-            metadata=request.metadata,
-        )
-
-        # Build recent conversation history (last 6 messages = 3 turns)
-        recent = session.get_conversation_history(limit=6)
+        # Build recent conversation history (last 6 messages = 3 turns, ending with this one)
+        recent = await _run(session_manager.get_conversation_history, session.session_id, limit=5)
         history_lines = [f"{msg.role.upper()}: {msg.content}" for msg in recent]
+        history_lines.append(f"{MessageRole.USER.upper()}: {request.message}")
         history = "\n".join(history_lines)
 
+        # Persist the user message while the knowledge graph is being queried
+        save_task = asyncio.create_task(
+            _run(
+                session_manager.add_message,
+                session_id=session.session_id,
+                role=MessageRole.USER,
+                content=request.message,
+                metadata=request.metadata,
+            )
+        )
+
         # Query MCP knowledge graph
-        trace_id = str(uuid.uuid4().hex)
+        trace_id = uuid.uuid4().hex
         try:
             kg_data = await query_mcp_knowledge_graph(
                 user_input=request.message,
@@ -229,19 +305,23 @@ async def chat(request: ChatRequest):
             )
             source = "error"
 
-        # Add assistant response to conversation
-        session_manager.add_message(
+        # Add assistant response to conversation, after the user message it answers
+        await save_task
+        await _run(
+            session_manager.add_message,
             session_id=session.session_id,
             role=MessageRole.ASSISTANT,
             content=response_message,
             metadata={"source": source, "trace_id": trace_id},
         )
 
+        session_info = await _run(session_manager.get_session_info, session.session_id)
+
         return ChatResponse(
             session_id=session.session_id,
             message=response_message,
             metadata={
-                "message_count": len(session.messages),
+                "message_count": session_info.message_count if session_info else 0,
                 "source": source,
                 "trace_id": trace_id,
             },
@@ -260,7 +340,7 @@ async def chat(request: ChatRequest):
 @app.get("/api/sessions/{session_id}")
 async def get_session(session_id: str):
     """Get session information by ID."""
-    session_info = session_manager.get_session_info(session_id)
+    session_info = await _run(session_manager.get_session_info, session_id)
     if not session_info:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -270,47 +350,85 @@ async def get_session(session_id: str):
 
 
 @app.get("/api/sessions/{session_id}/history")
-async def get_session_history(session_id: str, limit: int = None):
-    """Get conversation history for a session."""
-    session = session_manager.get_session(session_id)
-    if not session:
+async def get_session_history(
+    session_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_HISTORY_PAGE, ge=1, le=MAX_HISTORY_PAGE),
+    stream: bool = False,
+):
+    """
+    Get conversation history for a session, oldest first.
+
+    Returns one page of ``limit`` messages starting at ``offset``, with ``next_offset``
+    set while more messages follow. With ``stream=true`` every message from ``offset``
+    on is sent as newline-delimited JSON, read from the store one page at a time.
+    """
+    session_info = await _run(session_manager.get_session_info, session_id)
+    if not session_info:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Session {session_id} not found",
         )
 
-    messages = session.get_conversation_history(limit=limit)
+    if stream:
+        return StreamingResponse(
+            _stream_messages(session_id, offset), media_type="application/x-ndjson"
+        )
+
+    messages = await _run(session_manager.get_messages, session_id, offset=offset, limit=limit)
+    end = offset + len(messages)
     return {
         "session_id": session_id,
         "messages": messages,
-        "total_messages": len(session.messages),
+        "offset": offset,
+        "limit": limit,
+        "next_offset": end if end < session_info.message_count else None,
+        "total_messages": session_info.message_count,
     }
 
 
+async def _stream_messages(session_id: str, offset: int) -> AsyncIterator[bytes]:
+    """Yield a session's messages as NDJSON lines, holding one page in memory at a time."""
+    while messages := await _run(
+        session_manager.get_messages, session_id, offset=offset, limit=MAX_HISTORY_PAGE
+    ):
+        for message in messages:
+            yield orjson.dumps(message.model_dump(mode="json")) + b"\n"
+        offset += len(messages)
+
+
 @app.get("/api/users/{user_id}/sessions")
-async def get_user_sessions(user_id: str, active_only: bool = True):
-    """Get all sessions for a user."""
-    sessions = session_manager.get_user_sessions(user_id, active_only=active_only)
+async def get_user_sessions(
+    user_id: str,
+    active_only: bool = True,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_SESSIONS_PAGE, ge=1, le=MAX_SESSIONS_PAGE),
+):
+    """
+    Get a user's sessions, most recently updated first.
+
+    Returns one page of ``limit`` sessions starting at ``offset``; ``session_count`` is
+    the total number of matching sessions and ``next_offset`` is set while more follow.
+    """
+    sessions = await _run(
+        session_manager.get_user_session_summaries, user_id, active_only=active_only
+    )
+    sessions.sort(key=lambda s: s.updated_at, reverse=True)
+    end = offset + limit
     return {
         "user_id": user_id,
         "session_count": len(sessions),
-        "sessions": [
-            {
-                "session_id": s.session_id,
-                "message_count": len(s.messages),
-                "created_at": s.created_at,
-                "updated_at": s.updated_at,
-                "is_active": s.is_active,
-            }
-            for s in sessions
-        ],
+        "sessions": sessions[offset:end],
+        "offset": offset,
+        "limit": limit,
+        "next_offset": end if end < len(sessions) else None,
     }
 
 
 @app.delete("/api/sessions/{session_id}")
 async def delete_session(session_id: str):
     """Delete a session."""
-    if not session_manager.delete_session(session_id):
+    if not await _run(session_manager.delete_session, session_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Session {session_id} not found",
@@ -321,7 +439,7 @@ async def delete_session(session_id: str):
 @app.post("/api/sessions/{session_id}/deactivate")
 async def deactivate_session(session_id: str):
     """Deactivate a session."""
-    if not session_manager.deactivate_session(session_id):
+    if not await _run(session_manager.deactivate_session, session_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Session {session_id} not found",
@@ -332,19 +450,45 @@ async def deactivate_session(session_id: str):
 @app.get("/api/stats")
 async def get_stats():
     """Get system statistics."""
-    return session_manager.get_stats()
+    stats = await _run(session_manager.get_stats)
+    if profile_routes:
+        stats["route_timings"] = {
+            path: {
+                "count": count,
+                "avg_ms": round(total / count * 1000, 3),
+                "max_ms": round(slowest * 1000, 3),
+            }
+            for path, (count, total, slowest) in list(route_timings.items())
+        }
+    return stats
 
 
 def main():
     """Run the FastAPI server."""
     import uvicorn
 
-    config = get_config()
     port = config.servers.topwr_api.port
     host = config.servers.topwr_api.host
+    workers = int(os.getenv("TOPWR_API_WORKERS", "1"))
+
+    if workers > 1 and not os.getenv("REDIS_URL"):
+        # Without Redis each worker process has its own SessionManager, so clients must
+        # be routed to the same worker (sticky sessions) or they will see unknown sessions.
+        logger.warning(
+            f"Running {workers} workers with in-process session storage; "
+            "sessions are not shared between workers"
+        )
 
-    logger.info(f"Starting server on {host}:{port}")
-    uvicorn.run(app, host=host, port=port)
+    logger.info(f"Starting server on {host}:{port} with {workers} worker(s)")
+    uvicorn.run(
+        "src.topwr_api.server:app" if workers > 1 else app,
+        host=host,
+        port=port,
+        workers=workers,
+        # The default "auto" loop and http picks uvloop and httptools where installed
+        access_log=debug,
+        log_level="info" if debug else "warning",
+    )
 
 
 if __name__ == "__main__":
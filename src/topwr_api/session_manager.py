@@ -1,25 +1,53 @@
 """Session management for conversation storage and retrieval."""
 
 import logging
+import os
 from datetime import datetime
+from itertools import count
 from threading import Lock
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set, Union
 
-from .models import ConversationSession, Message, MessageRole, SessionInfo
+from .models import ConversationSession, Message, MessageRole, SessionInfo, SessionSummary
+from .redis_session_manager import RedisSessionManager
 
 logger = logging.getLogger(__name__)
 
 
 class SessionManager:
-    """Thread-safe in-memory session manager for conversations."""
+    """
+    Thread-safe in-memory session manager for conversations.
+
+    Writes that change a session's messages, activity or existence (add_message,
+    update_session, delete_session, deactivate_session) are serialized by
+    ``_stats_lock`` together with the running counters they update, so the counters
+    cannot drift. Reads take no lock: every lookup is a single dict/set operation,
+    which is atomic under the GIL, and listings iterate over snapshots.
+    """
 
     def __init__(self):
-        """Initialize session manager with thread-safe storage."""
+        """Initialize session manager with in-memory storage."""
         self._sessions: Dict[str, ConversationSession] = {}
-        self._user_sessions: Dict[str, List[str]] = {}  # user_id -> [session_ids]
-        self._lock = Lock()
+        self._user_sessions: Dict[str, Set[str]] = {}  # user_id -> {session_ids}
+        self._user_active_sessions: Dict[str, Set[str]] = {}  # user_id -> {active ids}
+        self._summaries: Dict[str, SessionSummary] = {}  # session_id -> listing entry
+        self._total_messages = 0
+        self._active_count = 0
+        self._stats_lock = Lock()
+        # Monotonic write counter that orders sessions by their last update; next() on
+        # itertools.count is atomic, and unlike wall-clock time it never ties or goes back
+        self._version = count(1)
         logger.info("SessionManager initialized with in-memory storage")
 
+    @staticmethod
+    def _summarize(session: ConversationSession) -> SessionSummary:
+        return SessionSummary(
+            session_id=session.session_id,
+            message_count=len(session.messages),
+            created_at=session.created_at,
+            updated_at=session.updated_at,
+            is_active=session.is_active,
+        )
+
     def create_session(self, user_id: str, metadata: Optional[dict] = None) -> ConversationSession:
         """
         Create a new conversation session for a user.
@@ -31,17 +59,19 @@ class SessionManager:
         Returns:
             New ConversationSession instance
         """
-        with self._lock:
-            session = ConversationSession(user_id=user_id, metadata=metadata or {})
-            self._sessions[session.session_id] = session
+        session = ConversationSession(user_id=user_id, metadata=metadata or {})
+        session._update_seq = next(self._version)
+        self._sessions[session.session_id] = session
+        self._summaries[session.session_id] = self._summarize(session)
+        with self._stats_lock:
+            self._active_count += 1
 
-            # Track session by user_id
-            if user_id not in self._user_sessions:
-                self._user_sessions[user_id] = []
-            self._user_sessions[user_id].append(session.session_id)
+        # Track session by user_id
+        self._user_sessions.setdefault(user_id, set()).add(session.session_id)
+        self._user_active_sessions.setdefault(user_id, set()).add(session.session_id)
 
-            logger.info(f"Created session {session.session_id} for user {user_id}")
-            return session
+        logger.info(f"Created session {session.session_id} for user {user_id}")
+        return session
 
     def get_session(self, session_id: str) -> Optional[ConversationSession]:
         """
@@ -53,8 +83,7 @@ class SessionManager:
         Returns:
             ConversationSession if found, None otherwise
         """
-        with self._lock:
-            return self._sessions.get(session_id)
+        return self._sessions.get(session_id)
 
     def update_session(self, session: ConversationSession) -> bool:
         """
@@ -66,13 +95,25 @@ class SessionManager:
         Returns:
             True if successful, False if session not found
         """
-        with self._lock:
-            if session.session_id in self._sessions:
-                session.updated_at = datetime.utcnow()
-                self._sessions[session.session_id] = session
-                logger.debug(f"Updated session {session.session_id}")
-                return True
-            return False
+        with self._stats_lock:
+            # Callers usually edit the stored object in place, so diff against the
+            # summary this manager recorded rather than against the stored session
+            previous = self._summaries.get(session.session_id)
+            if previous is None or session.session_id not in self._sessions:
+                return False
+            session.updated_at = datetime.utcnow()
+            session._update_seq = next(self._version)
+            self._sessions[session.session_id] = session
+            self._summaries[session.session_id] = self._summarize(session)
+            self._active_count += session.is_active - previous.is_active
+            self._total_messages += len(session.messages) - previous.message_count
+        active_ids = self._user_active_sessions.setdefault(session.user_id, set())
+        if session.is_active:
+            active_ids.add(session.session_id)
+        else:
+            active_ids.discard(session.session_id)
+        logger.debug(f"Updated session {session.session_id}")
+        return True
 
     def delete_session(self, session_id: str) -> bool:
         """
@@ -84,15 +125,19 @@ class SessionManager:
         Returns:
             True if deleted, False if not found
         """
-        with self._lock:
-            if session_id in self._sessions:
-                session = self._sessions.pop(session_id)
-                # Remove from user sessions tracking
-                if session.user_id in self._user_sessions:
-                    self._user_sessions[session.user_id].remove(session_id)
-                logger.info(f"Deleted session {session_id}")
-                return True
-            return False
+        with self._stats_lock:
+            session = self._sessions.pop(session_id, None)
+            if session is None:
+                return False
+            self._summaries.pop(session_id, None)
+            self._total_messages -= len(session.messages)
+            self._active_count -= session.is_active
+
+        # Remove from user sessions tracking
+        self._user_sessions.get(session.user_id, set()).discard(session_id)
+        self._user_active_sessions.get(session.user_id, set()).discard(session_id)
+        logger.info(f"Deleted session {session_id}")
+        return True
 
     def get_user_sessions(
         self, user_id: str, active_only: bool = True
@@ -107,14 +152,26 @@ class SessionManager:
         Returns:
             List of ConversationSession objects
         """
-        with self._lock:
-            session_ids = self._user_sessions.get(user_id, [])
-            sessions = [self._sessions[sid] for sid in session_ids if sid in self._sessions]
+        index = self._user_active_sessions if active_only else self._user_sessions
+        session_ids = list(index.get(user_id, ()))
+        return [s for s in map(self._sessions.get, session_ids) if s is not None]
 
-            if active_only:
-                sessions = [s for s in sessions if s.is_active]
+    def get_user_session_summaries(
+        self, user_id: str, active_only: bool = True
+    ) -> List[SessionSummary]:
+        """
+        Get listing entries for a user's sessions without touching their messages.
+
+        Args:
+            user_id: User identifier
+            active_only: If True, return only active sessions
 
-            return sessions
+        Returns:
+            List of SessionSummary objects
+        """
+        index = self._user_active_sessions if active_only else self._user_sessions
+        session_ids = list(index.get(user_id, ()))
+        return [s for s in map(self._summaries.get, session_ids) if s is not None]
 
     def get_active_session(self, user_id: str) -> Optional[ConversationSession]:
         """
@@ -127,11 +184,8 @@ class SessionManager:
             Most recent active ConversationSession or None
         """
         sessions = self.get_user_sessions(user_id, active_only=True)
-        if not sessions:
-            return None
-
         # Return most recently updated session
-        return sorted(sessions, key=lambda s: s.updated_at, reverse=True)[0]
+        return max(sessions, key=lambda s: s._update_seq, default=None)
 
     def add_message(
         self, session_id: str, role: MessageRole, content: str, metadata: Optional[dict] = None
@@ -148,15 +202,62 @@ class SessionManager:
         Returns:
             Created Message object or None if session not found
         """
-        with self._lock:
+        with self._stats_lock:
+            # Appending under the lock keeps the counts in step with a concurrent
+            # add_message, update_session or delete_session on the same session
             session = self._sessions.get(session_id)
             if not session:
                 logger.warning(f"Session {session_id} not found")
                 return None
 
+            stored = len(session.messages)
             message = session.add_message(role, content, metadata)
-            logger.debug(f"Added {role.value} message to session {session_id}")
-            return message
+            session._update_seq = next(self._version)
+            # A full history evicts its oldest message, so the total may not change
+            self._total_messages += len(session.messages) - stored
+            summary = self._summaries.get(session_id)
+            if summary is not None:
+                summary.message_count = len(session.messages)
+                summary.updated_at = session.updated_at
+        logger.debug(f"Added {role.value} message to session {session_id}")
+        return message
+
+    def get_conversation_history(
+        self, session_id: str, limit: Optional[int] = None
+    ) -> List[Message]:
+        """
+        Get the last N messages of a session.
+
+        Args:
+            session_id: Session identifier
+            limit: Number of most recent messages to return, all if None
+
+        Returns:
+            List of messages, oldest first (empty if the session does not exist)
+        """
+        session = self._sessions.get(session_id)
+        if not session:
+            return []
+        return session.get_conversation_history(limit=limit)
+
+    def get_messages(
+        self, session_id: str, offset: int = 0, limit: Optional[int] = None
+    ) -> List[Message]:
+        """
+        Get a page of a session's messages.
+
+        Args:
+            session_id: Session identifier
+            offset: Number of oldest messages to skip
+            limit: Maximum number of messages to return, all remaining if None
+
+        Returns:
+            List of messages, oldest first (empty if the session does not exist)
+        """
+        session = self._sessions.get(session_id)
+        if not session:
+            return []
+        return session.get_messages(offset=offset, limit=limit)
 
     def deactivate_session(self, session_id: str) -> bool:
         """
@@ -168,14 +269,22 @@ class SessionManager:
         Returns:
             True if successful, False if session not found
         """
-        with self._lock:
+        with self._stats_lock:
             session = self._sessions.get(session_id)
-            if session:
-                session.is_active = False
-                session.updated_at = datetime.utcnow()
-                logger.info(f"Deactivated session {session_id}")
-                return True
-            return False
+            if not session:
+                return False
+            if session.is_active:
+                self._active_count -= 1
+            session.is_active = False
+        session.updated_at = datetime.utcnow()
+        session._update_seq = next(self._version)
+        self._user_active_sessions.get(session.user_id, set()).discard(session_id)
+        summary = self._summaries.get(session_id)
+        if summary is not None:
+            summary.is_active = False
+            summary.updated_at = session.updated_at
+        logger.info(f"Deactivated session {session_id}")
+        return True
 
     def get_session_info(self, session_id: str) -> Optional[SessionInfo]:
         """
@@ -187,19 +296,18 @@ class SessionManager:
         Returns:
             SessionInfo object or None if not found
         """
-        with self._lock:
-            session = self._sessions.get(session_id)
-            if not session:
-                return None
+        session = self._sessions.get(session_id)
+        if not session:
+            return None
 
-            return SessionInfo(
-                session_id=session.session_id,
-                user_id=session.user_id,
-                message_count=len(session.messages),
-                created_at=session.created_at,
-                updated_at=session.updated_at,
-                is_active=session.is_active,
-            )
+        return SessionInfo(
+            session_id=session.session_id,
+            user_id=session.user_id,
+            message_count=len(session.messages),
+            created_at=session.created_at,
+            updated_at=session.updated_at,
+            is_active=session.is_active,
+        )
 
     def get_all_sessions(self) -> List[SessionInfo]:
         """
@@ -208,18 +316,17 @@ class SessionManager:
         Returns:
             List of SessionInfo objects
         """
-        with self._lock:
-            return [
-                SessionInfo(
-                    session_id=s.session_id,
-                    user_id=s.user_id,
-                    message_count=len(s.messages),
-                    created_at=s.created_at,
-                    updated_at=s.updated_at,
-                    is_active=s.is_active,
-                )
-                for s in self._sessions.values()
-            ]
+        return [
+            SessionInfo(
+                session_id=s.session_id,
+                user_id=s.user_id,
+                message_count=len(s.messages),
+                created_at=s.created_at,
+                updated_at=s.updated_at,
+                is_active=s.is_active,
+            )
+            for s in list(self._sessions.values())
+        ]
 
     def clear_all_sessions(self) -> int:
         """
@@ -228,12 +335,16 @@ class SessionManager:
         Returns:
             Number of sessions cleared
         """
-        with self._lock:
-            count = len(self._sessions)
-            self._sessions.clear()
-            self._user_sessions.clear()
-            logger.warning(f"Cleared all {count} sessions")
-            return count
+        count = len(self._sessions)
+        self._sessions.clear()
+        self._user_sessions.clear()
+        self._user_active_sessions.clear()
+        self._summaries.clear()
+        with self._stats_lock:
+            self._total_messages = 0
+            self._active_count = 0
+        logger.warning(f"Cleared all {count} sessions")
+        return count
 
     def get_stats(self) -> dict:
         """
@@ -242,19 +353,31 @@ class SessionManager:
         Returns:
             Dictionary with session statistics
         """
-        with self._lock:
-            total_sessions = len(self._sessions)
-            active_sessions = sum(1 for s in self._sessions.values() if s.is_active)
-            total_messages = sum(len(s.messages) for s in self._sessions.values())
-            unique_users = len(self._user_sessions)
-
-            return {
-                "total_sessions": total_sessions,
-                "active_sessions": active_sessions,
-                "inactive_sessions": total_sessions - active_sessions,
-                "total_messages": total_messages,
-                "unique_users": unique_users,
-                "avg_messages_per_session": (
-                    total_messages / total_sessions if total_sessions > 0 else 0
-                ),
-            }
+        total_sessions = len(self._sessions)
+        active_sessions = self._active_count
+        total_messages = self._total_messages
+        unique_users = len(self._user_sessions)
+
+        return {
+            "total_sessions": total_sessions,
+            "active_sessions": active_sessions,
+            "inactive_sessions": total_sessions - active_sessions,
+            "total_messages": total_messages,
+            "unique_users": unique_users,
+            "avg_messages_per_session": (
+                total_messages / total_sessions if total_sessions > 0 else 0
+            ),
+        }
+
+
+def create_session_manager() -> Union[SessionManager, RedisSessionManager]:
+    """
+    Create the session manager for this process.
+
+    Sessions are kept in Redis when ``REDIS_URL`` is set, so that several API workers
+    can share them; otherwise they live in process memory.
+    """
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        return RedisSessionManager(redis_url)
+    return SessionManager()
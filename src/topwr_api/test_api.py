@@ -9,7 +9,9 @@ async def test_api():
     """Test the ToPWR API endpoints."""
     base_url = "http://localhost:8000"
 
-    async with httpx.AsyncClient() as client:
+    # One client for every step, so requests reuse keep-alive connections
+    limits = httpx.Limits(max_keepalive_connections=50)
+    async with httpx.AsyncClient(limits=limits) as client:
         print("🧪 Testing ToPWR API...\n")
 
         # 1. Test health endpoint
@@ -45,11 +47,18 @@ async def test_api():
         chat_response = response.json()
         print(f"   Message count: {chat_response['metadata']['message_count']}\n")
 
+        # 4-7. Independent reads on the session, sent concurrently
+        history_response, sessions_response, stats_response, info_response = await asyncio.gather(
+            client.get(f"{base_url}/api/sessions/{session_id}/history"),
+            client.get(f"{base_url}/api/users/test_user_123/sessions"),
+            client.get(f"{base_url}/api/stats"),
+            client.get(f"{base_url}/api/sessions/{session_id}"),
+        )
+
         # 4. Get conversation history
         print("4️⃣ Getting conversation history...")
-        response = await client.get(f"{base_url}/api/sessions/{session_id}/history")
-        print(f"   Status: {response.status_code}")
-        history = response.json()
+        print(f"   Status: {history_response.status_code}")
+        history = history_response.json()
         print(f"   Total messages: {history['total_messages']}")
         for i, msg in enumerate(history["messages"], 1):
             print(f"   [{i}] {msg['role']}: {msg['content'][:50]}...")
@@ -57,23 +66,20 @@ async def test_api():
 
         # 5. Get user sessions
         print("5️⃣ Getting user sessions...")
-        response = await client.get(f"{base_url}/api/users/test_user_123/sessions")
-        print(f"   Status: {response.status_code}")
-        user_sessions = response.json()
+        print(f"   Status: {sessions_response.status_code}")
+        user_sessions = sessions_response.json()
         print(f"   Session count: {user_sessions['session_count']}\n")
 
         # 6. Get system stats
         print("6️⃣ Getting system statistics...")
-        response = await client.get(f"{base_url}/api/stats")
-        print(f"   Status: {response.status_code}")
-        stats = response.json()
+        print(f"   Status: {stats_response.status_code}")
+        stats = stats_response.json()
         print(f"   Stats: {stats}\n")
 
         # 7. Get session info
         print("7️⃣ Getting session info...")
-        response = await client.get(f"{base_url}/api/sessions/{session_id}")
-        print(f"   Status: {response.status_code}")
-        session_info = response.json()
+        print(f"   Status: {info_response.status_code}")
+        session_info = info_response.json()
         print(f"   Session Info: {session_info}\n")
 
         print("✅ All tests passed!")
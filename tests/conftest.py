@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# Modules import both ``src.config`` and, in the data pipeline scripts, ``config``
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT), str(ROOT / "src")]
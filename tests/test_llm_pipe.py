@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain_openai")
+pytest.importorskip("langgraph")
+
+from scripts.data_pipeline.llm_pipe import LLMPipe  # noqa: E402
+
+NODE_A = {"label": "Faculty", "title": "W4", "context": ""}
+NODE_B = {"label": "Course", "title": "Algorithms", "context": ""}
+EDGE = {
+    "source_label": "Faculty",
+    "source": "W4",
+    "type": "OFFERS",
+    "target_label": "Course",
+    "target": "Algorithms",
+}
+
+
+def _stream(partials):
+    pipe = LLMPipe.__new__(LLMPipe)  # _take_complete needs no models or config
+    emitted = {"nodes": 0, "edges": 0}
+    chunks = [pipe._take_complete(p, emitted, final=False) for p in partials]
+    chunks.append(pipe._take_complete(partials[-1], emitted, final=True))
+    return chunks
+
+
+def test_edges_wait_for_the_last_node():
+    chunks = _stream(
+        [
+            {"nodes": [NODE_A]},
+            {"nodes": [NODE_A, NODE_B]},
+            {"nodes": [NODE_A, NODE_B], "edges": [EDGE]},
+            {"nodes": [NODE_A, NODE_B], "edges": [EDGE, EDGE]},
+        ]
+    )
+
+    seen_titles = set()
+    for chunk in chunks:
+        seen_titles.update(node["title"] for node in chunk["nodes"])
+        for edge in chunk["edges"]:
+            assert {edge["source"], edge["target"]} <= seen_titles
+
+    assert sum(len(chunk["nodes"]) for chunk in chunks) == 2
+    assert sum(len(chunk["edges"]) for chunk in chunks) == 2
+
+
+def test_edges_written_before_nodes_are_held_until_nodes_complete():
+    chunks = _stream(
+        [
+            {"edges": [EDGE]},
+            {"edges": [EDGE], "nodes": [NODE_A]},
+            {"edges": [EDGE], "nodes": [NODE_A, NODE_B]},
+        ]
+    )
+
+    assert all(not chunk["edges"] for chunk in chunks[:-1])
+    assert chunks[-1]["edges"] and {n["title"] for n in chunks[-1]["nodes"]} == {"Algorithms"}
+
+
+class _FailingStream:
+    async def astream(self, _):
+        yield {"nodes": [NODE_A, NODE_B]}
+        raise RuntimeError("connection reset")
+
+
+def test_stream_failure_midway_falls_back_to_the_full_extraction():
+    full = {"nodes": [NODE_A, NODE_B], "edges": [EDGE]}
+
+    async def arun(context):
+        return full
+
+    pipe = LLMPipe.__new__(LLMPipe)
+    pipe._cache = {}
+    pipe.stream_chain = _FailingStream()
+    pipe.arun = arun
+
+    async def collect():
+        return [rows async for rows in pipe.astream_rows("chunk")]
+
+    chunks = asyncio.run(collect())
+
+    assert chunks[0]["nodes"] == [NODE_A] and not chunks[0]["edges"]
+    assert chunks[-1] == full
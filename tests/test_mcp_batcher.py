@@ -0,0 +1,166 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastmcp")
+orjson = pytest.importorskip("orjson")
+
+from fastmcp.exceptions import ToolError  # noqa: E402
+
+from topwr_api.mcp_batcher import BATCH_TOOL_NAME, MCPQueryBatcher  # noqa: E402
+
+
+def _text_result(text: str):
+    return SimpleNamespace(content=[SimpleNamespace(text=text)])
+
+
+class StubClient:
+    """Stands in for fastmcp.Client; call_tool answers through the given handler."""
+
+    def __init__(self, handler, batch_tool: bool = False):
+        self.handler = handler
+        self.tools = [SimpleNamespace(name="knowledge_graph_tool")]
+        if batch_tool:
+            self.tools.append(SimpleNamespace(name=BATCH_TOOL_NAME))
+        self.connected = True
+        self.calls = []
+        self.reconnects = 0
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    async def close(self) -> None:
+        self.connected = False
+
+    async def __aenter__(self):
+        self.connected = True
+        self.reconnects += 1
+        return self
+
+    async def list_tools(self):
+        return self.tools
+
+    async def call_tool(self, name: str, arguments: dict):
+        self.calls.append((name, arguments))
+        return _text_result(self.handler(name, arguments, len(self.calls)))
+
+
+def _run_queries(client, questions, **batcher_kwargs):
+    async def run():
+        batcher = MCPQueryBatcher(client, **batcher_kwargs)
+        batcher.start()
+        try:
+            return await asyncio.gather(
+                *(batcher.query(question) for question in questions), return_exceptions=True
+            )
+        finally:
+            await batcher.stop()
+
+    return asyncio.run(run())
+
+
+def test_dead_session_is_reopened_and_the_call_retried_once():
+    def handler(name, arguments, call):
+        if call == 1:
+            raise RuntimeError("Session terminated")
+        return f"answer to {arguments['user_input']}"
+
+    client = StubClient(handler)
+
+    assert _run_queries(client, ["q"]) == ["answer to q"]
+    assert client.reconnects == 1
+    assert len(client.calls) == 2
+
+
+def test_tool_errors_do_not_reconnect():
+    def handler(name, arguments, call):
+        raise ToolError("bad query")
+
+    client = StubClient(handler)
+
+    [result] = _run_queries(client, ["q"])
+
+    assert isinstance(result, ToolError)
+    assert client.reconnects == 0
+    assert len(client.calls) == 1
+
+
+def test_disconnected_client_connects_before_the_call():
+    client = StubClient(lambda name, arguments, call: "ok")
+    client.connected = False
+
+    assert _run_queries(client, ["q"]) == ["ok"]
+    assert client.reconnects == 1
+
+
+def _batch_handler(answer_for):
+    """Answer batch calls with answer_for(queries); single calls are not expected."""
+
+    def handler(name, arguments, call):
+        assert name == BATCH_TOOL_NAME
+        return orjson.dumps(answer_for(arguments["queries"])).decode()
+
+    return handler
+
+
+def test_batch_answers_are_split_back_to_each_caller():
+    client = StubClient(
+        _batch_handler(lambda queries: [{"answer": q["user_input"].upper()} for q in queries]),
+        batch_tool=True,
+    )
+
+    results = _run_queries(client, ["a", "b", "c"], max_wait_ms=50)
+
+    assert results == ["A", "B", "C"]
+    assert len(client.calls) == 1
+
+
+def test_error_entries_fail_only_their_own_query():
+    client = StubClient(
+        _batch_handler(lambda queries: [{"answer": "A"}, {"error": "boom"}, 5]),
+        batch_tool=True,
+    )
+
+    a, b, c = _run_queries(client, ["a", "b", "c"], max_wait_ms=50)
+
+    assert a == "A"
+    assert isinstance(b, RuntimeError) and str(b) == "boom"
+    assert isinstance(c, RuntimeError) and "Malformed" in str(c)
+
+
+def test_short_batch_answer_fails_the_unanswered_queries():
+    client = StubClient(_batch_handler(lambda queries: [{"answer": "A"}]), batch_tool=True)
+
+    a, b, c = _run_queries(client, ["a", "b", "c"], max_wait_ms=50)
+
+    assert a == "A"
+    assert isinstance(b, RuntimeError) and isinstance(c, RuntimeError)
+
+
+def test_failed_batch_fails_every_pending_query():
+    def handler(name, arguments, call):
+        raise ToolError("RAG not initialized")
+
+    client = StubClient(handler, batch_tool=True)
+
+    results = _run_queries(client, ["a", "b", "c"], max_wait_ms=50)
+
+    assert len(client.calls) == 1
+    assert all(isinstance(result, ToolError) for result in results)
+
+
+def test_stop_fails_queries_that_were_never_sent():
+    client = StubClient(lambda name, arguments, call: "unused")
+
+    async def run():
+        batcher = MCPQueryBatcher(client)  # never started, so nothing is collected
+        query = asyncio.ensure_future(batcher.query("a"))
+        await asyncio.sleep(0)
+        await batcher.stop()
+        return await asyncio.gather(query, return_exceptions=True)
+
+    [result] = asyncio.run(run())
+
+    assert isinstance(result, RuntimeError)
+    assert client.calls == []
@@ -0,0 +1,152 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from topwr_api import redis_session_manager  # noqa: E402
+from topwr_api.models import MessageRole  # noqa: E402
+from topwr_api.redis_session_manager import (  # noqa: E402
+    SESSION_TTL_SECONDS,
+    RedisSessionManager,
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable replacement for the time module used for expiry scores."""
+    now = SimpleNamespace(value=1_000_000.0)
+    monkeypatch.setattr(redis_session_manager, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+@pytest.fixture
+def manager(monkeypatch, clock):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        redis_session_manager.Redis,
+        "from_url",
+        lambda url, **kwargs: fakeredis.FakeRedis(server=server, **kwargs),
+    )
+    return RedisSessionManager("redis://localhost:6379/0")
+
+
+def _assert_counters_match(manager: RedisSessionManager) -> None:
+    sessions = manager.get_all_sessions()
+    stats = manager.get_stats()
+    assert stats["total_sessions"] == len(sessions)
+    assert stats["active_sessions"] == sum(s.is_active for s in sessions)
+    assert stats["total_messages"] == sum(s.message_count for s in sessions)
+    assert stats["unique_users"] == len({s.user_id for s in sessions})
+
+
+def test_create_and_get_session(manager):
+    session = manager.create_session("alice", metadata={"lang": "pl"})
+
+    loaded = manager.get_session(session.session_id)
+
+    assert loaded.user_id == "alice"
+    assert loaded.metadata == {"lang": "pl"}
+    assert loaded.is_active
+    assert manager.get_session("missing") is None
+    assert manager.get_stats()["unique_users"] == 1
+    _assert_counters_match(manager)
+
+
+def test_add_message_updates_history_and_counters(manager):
+    session = manager.create_session("alice")
+
+    manager.add_message(session.session_id, MessageRole.USER, "hi")
+    manager.add_message(session.session_id, MessageRole.ASSISTANT, "hello")
+
+    history = manager.get_conversation_history(session.session_id)
+    assert [m.content for m in history] == ["hi", "hello"]
+    assert manager.get_session_info(session.session_id).message_count == 2
+    assert manager.get_stats()["total_messages"] == 2
+    assert manager.add_message("missing", MessageRole.USER, "hi") is None
+    _assert_counters_match(manager)
+
+
+def test_history_cap_keeps_counters_capped(manager, monkeypatch):
+    monkeypatch.setattr(redis_session_manager, "MAX_SESSION_MESSAGES", 3)
+    session = manager.create_session("alice")
+
+    for i in range(5):
+        manager.add_message(session.session_id, MessageRole.USER, str(i))
+
+    history = manager.get_conversation_history(session.session_id)
+    assert [m.content for m in history] == ["2", "3", "4"]
+    assert manager.get_stats()["total_messages"] == 3
+    _assert_counters_match(manager)
+
+
+def test_deactivate_session(manager):
+    session = manager.create_session("alice")
+
+    assert manager.deactivate_session(session.session_id)
+
+    assert not manager.get_session(session.session_id).is_active
+    assert manager.get_user_sessions("alice", active_only=True) == []
+    assert len(manager.get_user_sessions("alice", active_only=False)) == 1
+    assert manager.get_stats()["active_sessions"] == 0
+    assert not manager.deactivate_session("missing")
+    _assert_counters_match(manager)
+
+
+def test_delete_session_removes_every_trace(manager):
+    session = manager.create_session("alice")
+    manager.add_message(session.session_id, MessageRole.USER, "hi")
+
+    assert manager.delete_session(session.session_id)
+    assert not manager.delete_session(session.session_id)
+    assert manager.add_message(session.session_id, MessageRole.USER, "late") is None
+
+    stats = manager.get_stats()
+    assert stats["total_sessions"] == 0
+    assert stats["total_messages"] == 0
+    assert stats["unique_users"] == 0
+    leftover = set(manager._redis.keys("topwr:*")) - {"topwr:total_messages"}
+    assert leftover == set()
+
+
+def test_expired_sessions_are_pruned_from_listings_and_stats(manager, clock):
+    old = manager.create_session("alice")
+    manager.add_message(old.session_id, MessageRole.USER, "old")
+    clock.value += SESSION_TTL_SECONDS / 2
+    fresh = manager.create_session("bob")
+    manager.add_message(fresh.session_id, MessageRole.USER, "fresh")
+
+    clock.value += SESSION_TTL_SECONDS / 2 + 1
+
+    assert [s.session_id for s in manager.get_all_sessions()] == [fresh.session_id]
+    assert manager.get_user_session_summaries("alice") == []
+    stats = manager.get_stats()
+    assert stats["total_sessions"] == 1
+    assert stats["total_messages"] == 1
+    assert stats["unique_users"] == 1
+    _assert_counters_match(manager)
+
+
+def test_counters_stay_consistent_across_mixed_operations(manager):
+    rng = random.Random(0)
+    session_ids = [manager.create_session(f"user{i % 3}").session_id for i in range(6)]
+
+    for _ in range(300):
+        session_id = rng.choice(session_ids)
+        action = rng.random()
+        if action < 0.7:
+            manager.add_message(session_id, MessageRole.USER, "msg")
+        elif action < 0.8:
+            manager.deactivate_session(session_id)
+        elif action < 0.9:
+            session = manager.get_session(session_id)
+            if session:
+                session.is_active = True
+                manager.update_session(session)
+        elif manager.delete_session(session_id):
+            session_ids[session_ids.index(session_id)] = manager.create_session(
+                f"user{rng.randrange(5)}"
+            ).session_id
+
+    _assert_counters_match(manager)